@@ -1,7 +1,9 @@
 import google.generativeai as genai
 import pandas as pd # Import pandas
+import asyncio
 import os
 import random
+from functools import lru_cache
 from datetime import datetime # Import datetime for timestamping
 
 # Load API Key from credentials.py
@@ -23,14 +25,27 @@ except ImportError:
     upload_to_google_sheet = None # Set to None if import fails
 
 # --- Slack Notification Integration ---
-    # Attempt to import the send_slack_notification function
-    try:
-        from slack_notifier import send_slack_notification
-    except ImportError:
-        print("Warning: slack_notifier.py not found. Slack notifications will be skipped.")
-        send_slack_notification = None
+# Attempt to import the send_slack_notification function
+try:
+    from slack_notifier import send_slack_notification
+except ImportError:
+    print("Warning: slack_notifier.py not found. Slack notifications will be skipped.")
+    send_slack_notification = None
+
+MODEL_NAME = "models/gemini-2.0-flash"
+
+# Column order of the generation_details records logged to Google Sheets
+GENERATED_CONTENT_COLUMNS = [
+    "timestamp", "product_info_input", "content_type_requested", "tone_requested", "keywords_used",
+    "model_used", "generated_content", "status", "error_message", "cached_prompt_tokens"
+]
+
+@lru_cache(maxsize=4)
+def _get_model(name):
+    """Returns a GenerativeModel for the given name, constructed once and reused across calls."""
+    return genai.GenerativeModel(name)
 
-def generate_marketing_content_gemini(product_info, content_type="tweet", tone="engaging", keywords=None):
+async def generate_marketing_content_gemini(product_info, content_type="tweet", tone="engaging", keywords=None):
     """
     Generates marketing content using Google's Gemini models based on product information.
 
@@ -45,25 +60,28 @@ def generate_marketing_content_gemini(product_info, content_type="tweet", tone="
                of generation details for logging, or (error_message, None) if an error occurs.
     """
     
+    # Invariant product/safety text goes first so repeated calls for the same product
+    # share a common prompt prefix that Gemini can serve from its implicit cache.
     prompt_parts = [
-        f"Generate a {tone} {content_type} for the following product, aiming for maximum audience engagement and positive reception.",
-        f"Product Description: {product_info}"
+        f"Product Description: {product_info}",
+        "Ensure content is positive and brand-safe.",
+        f"Generate a {tone} {content_type} for the product above, aiming for maximum audience engagement and positive reception."
     ]
     if keywords:
         prompt_parts.append(f"Ensure to include these keywords: {', '.join(keywords)}.")
     
     if content_type == "tweet":
-        prompt_parts.append("Keep it concise, ideally under 280 characters, and use relevant hashtags. Ensure content is positive and brand-safe.")
+        prompt_parts.append("Keep it concise, ideally under 280 characters, and use relevant hashtags.")
     elif content_type == "short ad copy":
-        prompt_parts.append("Keep it under 60 words and highly persuasive. Ensure content is positive and brand-safe.")
+        prompt_parts.append("Keep it under 60 words and highly persuasive.")
     elif content_type == "blog post introduction":
-        prompt_parts.append("Write a compelling introduction, around 150-200 words, that hooks the reader. Ensure content is positive and brand-safe.")
+        prompt_parts.append("Write a compelling introduction, around 150-200 words, that hooks the reader.")
     elif content_type == "social media post":
-        prompt_parts.append("Craft an engaging post suitable for platforms like Instagram or Facebook, including emojis if appropriate. Ensure content is positive and brand-safe.")
+        prompt_parts.append("Craft an engaging post suitable for platforms like Instagram or Facebook, including emojis if appropriate.")
 
     full_prompt = "\n".join(prompt_parts)
     
-    model_name = "models/gemini-2.0-flash" 
+    model_name = MODEL_NAME
 
     generation_details = {
         "timestamp": datetime.now().isoformat(),
@@ -74,22 +92,26 @@ def generate_marketing_content_gemini(product_info, content_type="tweet", tone="
         "model_used": model_name,
         "generated_content": "", # To be filled
         "status": "Failed",      # To be updated
-        "error_message": ""      # To be filled on error
+        "error_message": "",     # To be filled on error
+        "cached_prompt_tokens": 0 # Prompt tokens served from Gemini's cache
     }
 
     try:
         print(f"Generating {content_type} with Gemini model '{model_name}'...")
-        model = genai.GenerativeModel(model_name)
+        model = _get_model(model_name)
         
         generation_config = {
             "temperature": 0.6,
             "max_output_tokens": 150 if content_type == "tweet" else 400,
         }
         
-        response = model.generate_content(
+        response = await model.generate_content_async(
             full_prompt,
             generation_config=generation_config,
         )
+        usage_metadata = getattr(response, 'usage_metadata', None)
+        if usage_metadata is not None:
+            generation_details["cached_prompt_tokens"] = getattr(usage_metadata, 'cached_content_token_count', 0)
         
         if not response.text:
             error_msg = f"Content generation was blocked. Finish Reason: {response.candidates[0].finish_reason}"
@@ -120,6 +142,34 @@ def generate_marketing_content_gemini(product_info, content_type="tweet", tone="
         generation_details["error_message"] = error_msg
         return f"Error generating content: {e}", generation_details
 
+def generate_marketing_content_batch(product_info, content_requests):
+    """
+    Generates several pieces of marketing content for the same product.
+
+    Each piece is still its own generate_marketing_content_gemini request (one API call and
+    one RPM slot apiece, at the normal price); they're just awaited concurrently, so the
+    wall-clock time is about that of the slowest request rather than the sum of all of them.
+    This is not Gemini's Batch Mode, which the google-generativeai SDK doesn't provide.
+
+    Args:
+        product_info (str): A detailed description of the product, shared by every request.
+        content_requests (list): A list of dicts with the keyword arguments for each piece
+                                 of content (content_type, tone, keywords).
+
+    Returns:
+        list: One (str, dict) tuple per request, in the same order as content_requests.
+              A request that raised unexpectedly yields (error_message, None).
+    """
+    async def generate_all():
+        coroutines = [generate_marketing_content_gemini(product_info, **kwargs) for kwargs in content_requests]
+        return await asyncio.gather(*coroutines, return_exceptions=True)
+
+    results = asyncio.run(generate_all())
+    return [
+        (f"Error generating content: {result}", None) if isinstance(result, Exception) else result
+        for result in results
+    ]
+
 # --- Example Usage ---
 if __name__ == "__main__":
     generated_data_records = [] # List to store details of all generated content
@@ -130,50 +180,41 @@ if __name__ == "__main__":
         "It's perfect for enhancing productivity and decluttering your workspace. Sleek, minimalist design."
     )
 
-    print("\n--- Generating a Tweet ---")
-    tweet_content, tweet_details = generate_marketing_content_gemini(
-        example_product_info,
-        content_type="tweet",
-        tone="exciting",
-        keywords=["#LumiChargePro", "#SmartDesk", "#WirelessCharging", "#Productivity", "#TechGadget", "#HomeOffice"]
-    )
-    print("Generated Tweet:")
-    print(tweet_content)
-    generated_data_records.append(tweet_details) # Add details to our list
-
-    print("\n--- Generating a Short Ad Copy ---")
-    ad_copy, ad_details = generate_marketing_content_gemini(
-        example_product_info,
-        content_type="short ad copy",
-        tone="persuasive",
-        keywords=["declutter", "charge", "illuminate", "workspace", "efficiency", "modern design"]
-    )
-    print("Generated Ad Copy:")
-    print(ad_copy)
-    generated_data_records.append(ad_details) # Add details to our list
-
-    print("\n--- Generating a Social Media Post (Instagram/Facebook) ---")
-    social_post, social_details = generate_marketing_content_gemini(
-        example_product_info,
-        content_type="social media post",
-        tone="friendly",
-        keywords=["#WorkspaceGoals", "#TechGadget", "#SmartLiving", "#HomeUpgrade", "#MinimalistDesign", "#Productivity", "#AI"]
-    )
-    print("Generated Social Media Post:")
-    print(social_post)
-    generated_data_records.append(social_details) # Add details to our list
+    content_requests = [
+        ("Tweet", dict(
+            content_type="tweet",
+            tone="exciting",
+            keywords=["#LumiChargePro", "#SmartDesk", "#WirelessCharging", "#Productivity", "#TechGadget", "#HomeOffice"]
+        )),
+        ("Ad Copy", dict(
+            content_type="short ad copy",
+            tone="persuasive",
+            keywords=["declutter", "charge", "illuminate", "workspace", "efficiency", "modern design"]
+        )),
+        ("Social Media Post", dict(
+            content_type="social media post",
+            tone="friendly",
+            keywords=["#WorkspaceGoals", "#TechGadget", "#SmartLiving", "#HomeUpgrade", "#MinimalistDesign", "#Productivity", "#AI"]
+        )),
+    ]
+
+    print("\n--- Generating a Tweet, a Short Ad Copy and a Social Media Post ---")
+    results = generate_marketing_content_batch(example_product_info, [kwargs for _, kwargs in content_requests])
+
+    for (label, _), (content, details) in zip(content_requests, results):
+        print(f"\nGenerated {label}:")
+        print(content)
+        if details:
+            generated_data_records.append(details) # Add details to our list
 
     # --- Integrate with Google Sheets ---
     if upload_to_google_sheet:
         print("\n--- Uploading generated content to Google Sheets ---")
         try:
-            generated_df = pd.DataFrame(generated_data_records)
-            from upload_to_sheets import upload_to_google_sheet
+            generated_df = pd.DataFrame.from_records(generated_data_records, columns=GENERATED_CONTENT_COLUMNS)
             print("\nAttempting to upload data to Google Sheets...")
             upload_to_google_sheet(generated_df, "AI_Content_Optimizer_Data", "Generated_Marketing_Content")
             print("Successfully uploaded generated content to Google Sheets.")
-        except ImportError:
-            print("\nWarning: upload_to_sheets.py not found. Skipping Google Sheets upload.")
         except Exception as e:
             print(f"\nError uploading to Google Sheets: {e}")
 
@@ -181,24 +222,22 @@ if __name__ == "__main__":
         print("\nSkipping Google Sheets upload as 'upload_to_sheets.py' was not found or import failed.")
 
     # --- Slack Notification Integration ---
-    from slack_notifier import send_slack_notification
-
     if send_slack_notification:
-                slack_message = (
-                    f":sparkles: New marketing content generated and uploaded! :page_with_curl:\n"
-                    f"Product: *LumiCharge Pro*\n"
-                    f"Generated {len(generated_data_records)} pieces of content (Tweet, Ad Copy, Social Post).\n"
-                    f"Check the Google Sheet here: https://docs.google.com/spreadsheets/d/1aAdsgz9AagAOxkRSoxdaIaJ6N76U8G1xb4mPC-_h5HE/edit?usp=sharing\n" # IMPORTANT: Replace with actual link
-                    f"Worksheet: AI_Content_Optimizer_Data\n"
-                    f"Check: Generated_Marketing_Content worksheet for the details."
-                )
-                # MODIFICATION HERE: Add username and icon_emoji
-                send_slack_notification(
-                    slack_message,
-                    username="ContentGenius Bot", # A more specific name for content generation alerts
-                    icon_emoji=":bulb:" # A lightbulb emoji to signify new ideas/content
-                )
-                
+        slack_message = (
+            f":sparkles: New marketing content generated and uploaded! :page_with_curl:\n"
+            f"Product: *LumiCharge Pro*\n"
+            f"Generated {len(generated_data_records)} pieces of content (Tweet, Ad Copy, Social Post).\n"
+            f"Check the Google Sheet here: https://docs.google.com/spreadsheets/d/1aAdsgz9AagAOxkRSoxdaIaJ6N76U8G1xb4mPC-_h5HE/edit?usp=sharing\n" # IMPORTANT: Replace with actual link
+            f"Worksheet: AI_Content_Optimizer_Data\n"
+            f"Check: Generated_Marketing_Content worksheet for the details."
+        )
+        # MODIFICATION HERE: Add username and icon_emoji
+        send_slack_notification(
+            slack_message,
+            username="ContentGenius Bot", # A more specific name for content generation alerts
+            icon_emoji=":bulb:" # A lightbulb emoji to signify new ideas/content
+        )
+
     else:
         print("Slack notification function not available.")
     
@@ -2,40 +2,12 @@
 import pandas as pd
 import os
 import random
+import threading
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain
 import re
-import nltk
-
-# --- NLTK Data Path Configuration ---
-# Define a consistent NLTK data path
-NLTK_DATA_PATH = os.path.join(os.path.expanduser("~"), "nltk_data") 
-
-# Ensure this path is in NLTK's search paths
-if NLTK_DATA_PATH not in nltk.data.path:
-    nltk.data.path.append(NLTK_DATA_PATH)
-    # print(f"Added {NLTK_DATA_PATH} to NLTK data paths.") # Optional debug
-
-# Download NLTK resources to the specified path if they don't exist
-# Check for 'punkt_tab' (required in NLTK 3.8+)
-try:
-    nltk.data.find('tokenizers/punkt_tab', paths=[NLTK_DATA_PATH])
-except LookupError:
-    print(f"Downloading 'punkt_tab' to {NLTK_DATA_PATH}...")
-    nltk.download('punkt_tab', download_dir=NLTK_DATA_PATH)
-    print("'punkt_tab' downloaded.")
-
-# Check for 'stopwords'
-try:
-    nltk.data.find('corpora/stopwords', paths=[NLTK_DATA_PATH])
-except LookupError:
-    print(f"Downloading 'stopwords' to {NLTK_DATA_PATH}...")
-    nltk.download('stopwords', download_dir=NLTK_DATA_PATH)
-    print("'stopwords' downloaded.")
-# --- END NLTK Data Path Configuration ---
-
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import PorterStemmer
 
 # --- IMPORTANT CHANGE HERE ---
 # Import your Google Sheets handler functions
@@ -45,16 +17,67 @@ from google_sheets_handler import get_sheet_data, update_sheet_data
 # Define your main Google Spreadsheet name
 MAIN_SPREADSHEET_NAME = "AI_Content_Optimizer_Data" # This looks correct based on your sheet URL
 
-# Initialize NLTK English stop words
-ENGLISH_STOP_WORDS = set(stopwords.words('english'))
-ENGLISH_STOP_WORDS.update(["new", "product", "review", "best", "vs", "up", "at", "by", "what", "how", "when", "where", "why", "who",
-                           "this", "that", "these", "those", "can", "get", "just", "like", "make", "made", "from", "for", "with",
-                           "will", "it", "its", "you", "your", "are", "have", "been", "has", "had", "here", "there", "we", "our",
-                           "us", "they", "them", "their", "about", "all", "also", "and", "any", "but", "etc", "etc.", "every", "many",
-                           "much", "only", "other", "some", "such", "than", "then", "through", "under", "until", "upon", "would"])
+# --- NLTK Data Path Configuration ---
+# Define a consistent NLTK data path
+NLTK_DATA_PATH = os.path.join(os.path.expanduser("~"), "nltk_data") 
+
+# Extra domain words treated as stop words on top of NLTK's English list
+CUSTOM_STOP_WORDS = [
+    "new", "product", "review", "best", "vs", "up", "at", "by", "what", "how", "when", "where", "why", "who",
+    "this", "that", "these", "those", "can", "get", "just", "like", "make", "made", "from", "for", "with",
+    "will", "it", "its", "you", "your", "are", "have", "been", "has", "had", "here", "there", "we", "our",
+    "us", "they", "them", "their", "about", "all", "also", "and", "any", "but", "etc", "etc.", "every", "many",
+    "much", "only", "other", "some", "such", "than", "then", "through", "under", "until", "upon", "would"
+]
+
+# NLTK English stop words and the stemmer are set up by _ensure_nltk() on first use,
+# so importing this module doesn't pay for NLTK imports or download checks.
+ENGLISH_STOP_WORDS = frozenset()
+stemmer = None
+_nltk_ready = False
+_nltk_lock = threading.Lock()
+
+def _ensure_nltk():
+    """Downloads missing NLTK resources and initializes the stop words and stemmer (once per process)."""
+    global ENGLISH_STOP_WORDS, stemmer, _nltk_ready
+    if _nltk_ready:
+        return
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        import nltk
+
+        # Ensure this path is in NLTK's search paths
+        if NLTK_DATA_PATH not in nltk.data.path:
+            nltk.data.path.append(NLTK_DATA_PATH)
+
+        # Download NLTK resources to the specified path if they don't exist
+        # Check for 'stopwords'
+        try:
+            nltk.data.find('corpora/stopwords', paths=[NLTK_DATA_PATH])
+        except LookupError:
+            print(f"Downloading 'stopwords' to {NLTK_DATA_PATH}...")
+            nltk.download('stopwords', download_dir=NLTK_DATA_PATH)
+            print("'stopwords' downloaded.")
+
+        from nltk.corpus import stopwords
+        from nltk.stem import PorterStemmer
+
+        ENGLISH_STOP_WORDS = frozenset(stopwords.words('english')).union(CUSTOM_STOP_WORDS)
+        # Initialize stemmer for optional use
+        stemmer = PorterStemmer()
+        _nltk_ready = True
+# --- END NLTK Data Path Configuration ---
+
+@lru_cache(maxsize=65536)
+def _stem(word):
+    """Memoized stemmer.stem; the same vocabulary repeats across rows and worksheets."""
+    return stemmer.stem(word)
 
-# Initialize stemmer for optional use
-stemmer = PorterStemmer()
+# Precompiled patterns used by preprocess_text for every row
+_URL_RE = re.compile(r'http\S+|www\S+|https\S+|@\w+', re.MULTILINE) # URLs and mentions
+_HASHTAG_RE = re.compile(r'#(\w+)')
+_NONALPHA_RE = re.compile(r'[^a-zA-Z\s]')
 
 def preprocess_text(text, apply_stemming=True):
     """
@@ -64,23 +87,32 @@ def preprocess_text(text, apply_stemming=True):
     """
     if not isinstance(text, str):
         return []
+    _ensure_nltk()
 
     # Remove URLs, mentions
-    text = re.sub(r'http\S+|www\S+|https\S+|@\w+', '', text, flags=re.MULTILINE)
+    text = _URL_RE.sub('', text)
     # Remove hashtags but keep the word (e.g., #awesome -> awesome)
-    text = re.sub(r'#(\w+)', r'\1', text) 
+    text = _HASHTAG_RE.sub(r'\1', text)
     
     # Remove non-alphabetic characters and convert to lowercase
-    text = re.sub(r'[^a-zA-Z\s]', '', text).lower()
+    text = _NONALPHA_RE.sub('', text).lower()
     
-    tokens = word_tokenize(text)
+    return _tokenize_cleaned_text(text, apply_stemming)
+
+def _tokenize_cleaned_text(text, apply_stemming=True):
+    """
+    Tokenizes text that has already been stripped to lowercase letters and whitespace,
+    removing stop words and short words, and optionally applies stemming.
+    """
+    # Only letters and whitespace remain, so a plain split is all the tokenizing needed
+    tokens = text.split()
     
-    # Remove stop words and short words
-    tokens = [word for word in tokens if word not in ENGLISH_STOP_WORDS and len(word) > 2]
+    # Remove short words and stop words (the cheap length check runs first)
+    tokens = [word for word in tokens if len(word) > 2 and word not in ENGLISH_STOP_WORDS]
     
     # Optional: Apply stemming
     if apply_stemming:
-        tokens = [stemmer.stem(word) for word in tokens]
+        tokens = [_stem(word) for word in tokens]
         
     return tokens
 
@@ -95,17 +127,25 @@ def clean_and_update_sheet(worksheet_name, text_columns, apply_stemming=True):
         apply_stemming (bool): Whether to apply stemming during preprocessing.
     """
     print(f"Cleaning data for worksheet: '{worksheet_name}' in spreadsheet '{MAIN_SPREADSHEET_NAME}'")
+    _ensure_nltk()
     df = get_sheet_data(MAIN_SPREADSHEET_NAME, worksheet_name)
 
     if df is not None and not df.empty:
-        # Drop unnamed columns that sometimes appear after reading from sheets
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
+        # Drop leftover 'Unnamed: N' headers written back by older get_as_dataframe round-trips
+        df = df.drop(columns=[col for col in df.columns if str(col).startswith('Unnamed')])
 
+        tokenize = partial(_tokenize_cleaned_text, apply_stemming=apply_stemming)
         for col in text_columns:
             if col in df.columns:
                 print(f"  - Cleaning column: '{col}'")
-                # Apply preprocessing and convert list of tokens back to string for storage
-                df[f'cleaned_{col}'] = df[col].apply(lambda x: ' '.join(preprocess_text(x, apply_stemming)))
+                # Run the regex cleanup for the whole column at once, then tokenize each row
+                # and convert the list of tokens back to a string for storage
+                cleaned = (df[col].fillna('').astype(str)
+                           .str.replace(_URL_RE, '', regex=True)
+                           .str.replace(_HASHTAG_RE, r'\1', regex=True)
+                           .str.replace(_NONALPHA_RE, '', regex=True)
+                           .str.lower())
+                df[f'cleaned_{col}'] = cleaned.map(tokenize).map(' '.join)
             else:
                 print(f"  - Warning: Column '{col}' not found in '{worksheet_name}'. Skipping.")
         
@@ -131,110 +171,115 @@ def get_optimization_insights(num_keywords=5, num_themes=3, platform_focus=None,
     Returns:
         str: A formatted string containing data-driven insights for the LLM.
     """
-    all_processed_keywords = []
-    all_processed_themes = []
+    # Counters are fed straight from generators so no large intermediate token lists are built
+    keyword_counter = Counter()
+    theme_counter = Counter()
+
+    _ensure_nltk()
+    preprocess = partial(preprocess_text, apply_stemming=apply_stemming)
+
+    # Fetch each worksheet at most once per analysis run
+    fetched_sheets = {}
+    def load_sheet(worksheet_name):
+        if worksheet_name not in fetched_sheets:
+            fetched_sheets[worksheet_name] = get_sheet_data(MAIN_SPREADSHEET_NAME, worksheet_name)
+        return fetched_sheets[worksheet_name]
 
     print("\n--- Analyzing data for optimization insights ---")
 
     # --- 1. Process Google Trends Data ---
     if platform_focus in [None, 'google_trends']:
-        # Corrected worksheet name
-        gt_queries_df = get_sheet_data(MAIN_SPREADSHEET_NAME, "GoogleTrends_Related_Queries")
-        if not gt_queries_df.empty and 'query' in gt_queries_df.columns:
-            # Prioritize cleaned_query if it exists
-            query_col = 'cleaned_query' if 'cleaned_query' in gt_queries_df.columns else 'query'
-            for query in gt_queries_df[query_col].dropna():
-                all_processed_keywords.extend(preprocess_text(query, apply_stemming))
-            print(f"  Processed {len(gt_queries_df)} GoogleTrends_Related_Queries.")
-        
-        # Corrected worksheet name
-        gt_interest_df = get_sheet_data(MAIN_SPREADSHEET_NAME, "GoogleTrends_Related_Queries")
-        if not gt_interest_df.empty and 'keyword_searched' in gt_interest_df.columns:
-            # Prioritize cleaned_keyword if it exists
-            keyword_col = 'cleaned_keyword_searched' if 'cleaned_keyword_searched' in gt_interest_df.columns else 'keyword_searched'
-            for keyword in gt_interest_df[keyword_col].dropna():
-                all_processed_keywords.extend(preprocess_text(keyword, apply_stemming))
-            print(f"  Processed {len(gt_interest_df)} GoogleTrends_Related_Queries.")
+        # Related queries and the keywords they were searched for live in the same worksheet
+        gt_df = load_sheet("GoogleTrends_Related_Queries")
+        if not gt_df.empty:
+            if 'query' in gt_df.columns:
+                # Prioritize cleaned_query if it exists
+                query_col = 'cleaned_query' if 'cleaned_query' in gt_df.columns else 'query'
+                keyword_counter.update(chain.from_iterable(map(preprocess, gt_df[query_col].dropna())))
+
+            if 'keyword_searched' in gt_df.columns:
+                # Prioritize cleaned_keyword if it exists
+                keyword_col = 'cleaned_keyword_searched' if 'cleaned_keyword_searched' in gt_df.columns else 'keyword_searched'
+                keyword_counter.update(chain.from_iterable(map(preprocess, gt_df[keyword_col].dropna())))
+            print(f"  Processed {len(gt_df)} GoogleTrends_Related_Queries.")
 
 
     # --- 2. Process Twitter Data ---
     if platform_focus in [None, 'twitter']:
         # Corrected worksheet name
-        twitter_df = get_sheet_data(MAIN_SPREADSHEET_NAME, "Twitter_marketing_tweets")
+        twitter_df = load_sheet("Twitter_marketing_tweets")
         if not twitter_df.empty:
             # Prioritize cleaned text if available, otherwise use original
             text_col = 'cleaned_Tweet' if 'cleaned_Tweet' in twitter_df.columns else 'Tweet'
 
             if text_col in twitter_df.columns:
-                for tweet_text in twitter_df[text_col].dropna():
-                    all_processed_themes.extend(preprocess_text(tweet_text, apply_stemming))
+                # Tokenize each tweet once; the most-liked tweets reuse these tokens for their extra weight
+                tweet_tokens = twitter_df[text_col].dropna().map(preprocess)
+                theme_counter.update(chain.from_iterable(tweet_tokens))
                 
                 # Process hashtags from original text for dedicated keyword extraction
                 if 'Tweet' in twitter_df.columns:
                     for original_tweet_text in twitter_df['Tweet'].dropna():
-                        hashtags = re.findall(r'#(\w+)', original_tweet_text)
-                        all_processed_keywords.extend([stemmer.stem(tag.lower()) if apply_stemming else tag.lower() 
-                                                       for tag in hashtags if tag.lower() not in ENGLISH_STOP_WORDS])
-
-                if 'public_metrics.like_count' in twitter_df.columns and text_col in twitter_df.columns:
-                    top_tweets = twitter_df.sort_values(by='public_metrics.like_count', ascending=False).head(50)
-                    for tweet_text in top_tweets[text_col].dropna():
-                        all_processed_themes.extend(preprocess_text(tweet_text, apply_stemming))
+                        hashtags = _HASHTAG_RE.findall(original_tweet_text)
+                        keyword_counter.update(_stem(tag.lower()) if apply_stemming else tag.lower()
+                                               for tag in hashtags if tag.lower() not in ENGLISH_STOP_WORDS)
+
+                if 'public_metrics.like_count' in twitter_df.columns:
+                    top_idx = pd.to_numeric(twitter_df['public_metrics.like_count'], errors='coerce').nlargest(50).index
+                    theme_counter.update(chain.from_iterable(tweet_tokens.loc[top_idx.intersection(tweet_tokens.index)]))
                 print(f"  Processed {len(twitter_df)} Twitter tweets.")
 
 
     # --- 3. Process YouTube Data ---
     if platform_focus in [None, 'youtube']:
         # Corrected worksheet name
-        youtube_df = get_sheet_data(MAIN_SPREADSHEET_NAME, "YouTube_Product_Content")
+        youtube_df = load_sheet("YouTube_Product_Content")
         if not youtube_df.empty:
             title_col = 'cleaned_video_title' if 'cleaned_video_title' in youtube_df.columns else 'title'
             desc_col = 'cleaned_video_description' if 'cleaned_video_description' in youtube_df.columns else 'description'
             
             if title_col in youtube_df.columns:
-                for title in youtube_df[title_col].dropna():
-                    all_processed_keywords.extend(preprocess_text(title, apply_stemming))
-                    all_processed_themes.extend(preprocess_text(title, apply_stemming))
+                # Tokenize each title once and reuse the tokens for keywords, themes and the top-video weighting
+                title_tokens = youtube_df[title_col].dropna().map(preprocess)
+                keyword_counter.update(chain.from_iterable(title_tokens))
+                theme_counter.update(chain.from_iterable(title_tokens))
 
-            if desc_col in youtube_df.columns:
-                for desc in youtube_df[desc_col].dropna():
-                    all_processed_themes.extend(preprocess_text(desc, apply_stemming))
+                if 'view_count' in youtube_df.columns:
+                    top_idx = pd.to_numeric(youtube_df['view_count'], errors='coerce').nlargest(50).index
+                    theme_counter.update(chain.from_iterable(title_tokens.loc[top_idx.intersection(title_tokens.index)]))
 
-            if 'view_count' in youtube_df.columns and title_col in youtube_df.columns:
-                top_videos = youtube_df.sort_values(by='view_count', ascending=False).head(50)
-                for title in top_videos[title_col].dropna():
-                    all_processed_themes.extend(preprocess_text(title, apply_stemming))
-                print(f"  Processed {len(youtube_df)} YouTube videos.")
+            if desc_col in youtube_df.columns:
+                theme_counter.update(chain.from_iterable(map(preprocess, youtube_df[desc_col].dropna())))
+            print(f"  Processed {len(youtube_df)} YouTube videos.")
 
 
     # --- 4. Process Reddit Data ---
     if platform_focus in [None, 'reddit']:
         # Corrected worksheet name
-        reddit_df = get_sheet_data(MAIN_SPREADSHEET_NAME, "Reddit_Product_Content")
+        reddit_df = load_sheet("Reddit_Product_Content")
         if not reddit_df.empty:
             title_col = 'cleaned_title' if 'cleaned_title' in reddit_df.columns else 'title'
             selftext_col = 'cleaned_selftext' if 'cleaned_selftext' in reddit_df.columns else 'selftext'
 
             if title_col in reddit_df.columns:
-                for title in reddit_df[title_col].dropna():
-                    all_processed_keywords.extend(preprocess_text(title, apply_stemming))
-                    all_processed_themes.extend(preprocess_text(title, apply_stemming))
+                # Tokenize each title once and reuse the tokens for keywords, themes and the top-post weighting
+                title_tokens = reddit_df[title_col].dropna().map(preprocess)
+                keyword_counter.update(chain.from_iterable(title_tokens))
+                theme_counter.update(chain.from_iterable(title_tokens))
+
+                if 'score' in reddit_df.columns:
+                    top_idx = pd.to_numeric(reddit_df['score'], errors='coerce').nlargest(50).index
+                    theme_counter.update(chain.from_iterable(title_tokens.loc[top_idx.intersection(title_tokens.index)]))
             
             if selftext_col in reddit_df.columns:
-                for text in reddit_df[selftext_col].dropna():
-                    all_processed_themes.extend(preprocess_text(text, apply_stemming))
-            
-            if 'score' in reddit_df.columns and title_col in reddit_df.columns:
-                top_posts = reddit_df.sort_values(by='score', ascending=False).head(50)
-                for title in top_posts[title_col].dropna():
-                    all_processed_themes.extend(preprocess_text(title, apply_stemming))
+                theme_counter.update(chain.from_iterable(map(preprocess, reddit_df[selftext_col].dropna())))
             print(f"  Processed {len(reddit_df)} Reddit posts.")
 
     # --- Consolidate Keywords and Themes ---
-    top_keywords_final = [kw for kw, _ in Counter(all_processed_keywords).most_common(num_keywords)]
+    top_keywords_final = [kw for kw, _ in keyword_counter.most_common(num_keywords)]
 
     # For themes, we can use a higher threshold or different processing if needed
-    top_themes_candidates = [word for word, count in Counter(all_processed_themes).most_common(num_themes * 2) if count > 3]
+    top_themes_candidates = [word for word, count in theme_counter.most_common(num_themes * 2) if count > 3]
     # Filter themes to ensure they are distinct from top keywords if necessary
     top_themes_final = [theme for theme in top_themes_candidates if theme not in top_keywords_final][:num_themes]
 
@@ -268,8 +313,12 @@ if __name__ == "__main__":
         "GoogleTrends_Related_Queries": ['query', 'keyword_searched'], # Corrected from 'google_trends_related_queries'
     }
 
-    for worksheet_name, cols in sheets_to_clean.items():
-        clean_and_update_sheet(worksheet_name, cols, apply_stemming=True) # Apply stemming during cleaning
+    # Each worksheet is dominated by Sheets API I/O, so clean them concurrently
+    with ThreadPoolExecutor(max_workers=len(sheets_to_clean)) as executor:
+        futures = [executor.submit(clean_and_update_sheet, worksheet_name, cols, apply_stemming=True) # Apply stemming during cleaning
+                   for worksheet_name, cols in sheets_to_clean.items()]
+        for future in futures:
+            future.result()
 
     # --- Step 2: Generate Optimization Insights from Cleaned Data ---
     print("\nGenerating optimization insights from cleaned data...")
@@ -1,40 +1,214 @@
 # google_sheets_handler.py
+from cachetools import TTLCache
+from datetime import datetime, timedelta, timezone
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
 import gspread
-from gspread_dataframe import set_with_dataframe, get_as_dataframe
+from gspread.auth import DEFAULT_SCOPES
+from gspread.utils import absolute_range_name, fill_gaps, rowcol_to_a1
+import hashlib
+import json
+import numbers
+import numpy as np
 import pandas as pd
 import os
+import threading
 import time # For retries
 
 # Assuming 'service_account.json' is in the same directory as this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 SERVICE_ACCOUNT_PATH = os.path.join(SCRIPT_DIR, "service_account.json")
 
+# The service account's access token is cached on disk between runs, so a run started
+# while the previous token is still valid skips JWT signing and the token endpoint entirely.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-content-optimizer")
+TOKEN_CACHE_PATH = os.path.join(CACHE_DIR, "sheets_token.json")
+TOKEN_EXPIRY_MARGIN = timedelta(seconds=60)
+
+# The authorized client and opened spreadsheets are shared by every call in the process,
+# so authentication and the Drive lookup behind gc.open() happen once per process.
+_gspread_client = None
+_spreadsheets = {}
+_client_lock = threading.Lock()
+
+# Worksheet DataFrames fetched by get_sheet_data, keyed by (main_sheet_name, worksheet_name).
+# Entries expire after 5 minutes and are dropped whenever update_sheet_data writes the worksheet.
+SHEET_CACHE_TTL_SECONDS = 300
+_sheet_cache = TTLCache(maxsize=32, ttl=SHEET_CACHE_TTL_SECONDS)
+_sheet_cache_lock = threading.Lock()
+
+# Worksheet values are also kept on disk, tagged with the spreadsheet's Drive modifiedTime. A later run
+# that finds the spreadsheet unmodified reads them back instead of downloading the worksheet again.
+SHEET_DISK_CACHE_DIR = os.path.join(CACHE_DIR, "sheets")
+
 # --- Helper for Gspread Client ---
+def _utcnow():
+    """Naive UTC 'now', matching how google-auth stores Credentials.expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _load_cached_token(creds):
+    """Restores a still-valid access token from TOKEN_CACHE_PATH into creds. Returns True on success."""
+    try:
+        with open(TOKEN_CACHE_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+        expiry = datetime.fromisoformat(cached["expiry"])
+        if cached.get("client_email") != creds.service_account_email or expiry <= _utcnow() + TOKEN_EXPIRY_MARGIN:
+            return False
+        creds.token = cached["token"]
+        creds.expiry = expiry
+        return True
+    except (OSError, ValueError, KeyError):
+        return False
+
+def _save_cached_token(creds):
+    """Writes creds' current access token to TOKEN_CACHE_PATH (readable by the current user only)."""
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"client_email": creds.service_account_email, "token": creds.token, "expiry": creds.expiry.isoformat()}, f)
+    except OSError as e:
+        print(f"WARNING: Could not cache Google Sheets access token at {TOKEN_CACHE_PATH}: {e}")
+
 def _get_gspread_client():
-    """Authenticates with gspread using the service account and returns the client."""
+    """Authenticates with gspread using the service account (once per process) and returns the client."""
+    global _gspread_client
+    with _client_lock:
+        if _gspread_client is not None:
+            return _gspread_client
+        try:
+            if not os.path.exists(SERVICE_ACCOUNT_PATH):
+                raise FileNotFoundError(f"Service account JSON not found at: {SERVICE_ACCOUNT_PATH}")
+            
+            # print(f"DEBUG: Attempting to load service account from: {SERVICE_ACCOUNT_PATH}")
+            creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_PATH, scopes=DEFAULT_SCOPES)
+            # Still service-account credentials, so google-auth refreshes them itself once the cached token expires
+            if not _load_cached_token(creds):
+                creds.refresh(Request())
+                _save_cached_token(creds)
+            _gspread_client = gspread.authorize(creds)
+            # print(f"DEBUG: Service account loaded successfully.")
+            return _gspread_client
+        except FileNotFoundError as e:
+            print(f"ERROR: {e}")
+            print("Please ensure your Google Sheets service account JSON key file is correctly named and located.")
+            return None
+        except Exception as e:
+            print(f"ERROR: Failed to authenticate with Google Sheets: {type(e).__name__}: {e}")
+            print("Ensure Google Drive API and Google Sheets API are enabled in your GCP project.")
+            return None
+
+def _open_spreadsheet(gc, main_sheet_name):
+    """Opens a spreadsheet by name, reusing the handle from earlier calls in this process."""
+    with _client_lock:
+        spreadsheet = _spreadsheets.get(main_sheet_name)
+    if spreadsheet is None:
+        spreadsheet = gc.open(main_sheet_name)
+        with _client_lock:
+            spreadsheet = _spreadsheets.setdefault(main_sheet_name, spreadsheet)
+    return spreadsheet
+
+def _to_sheet_value(value):
+    """Converts a DataFrame cell into a JSON-serializable value for the Sheets values API."""
+    if isinstance(value, (list, tuple, set, dict)):
+        return str(value)
+    if pd.isna(value):
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return str(value)
+
+def _dataframe_to_values(dataframe):
+    """Serializes a DataFrame (header row first) into the 2D list sent to the Sheets values API."""
+    values = [[str(col) for col in dataframe.columns]]
+    values.extend([_to_sheet_value(value) for value in row] for row in dataframe.itertuples(index=False, name=None))
+    return values
+
+def _values_to_dataframe(rows):
+    """Builds a DataFrame from a rectangular 2D list of cell values whose first row is the header."""
+    df = pd.DataFrame(rows[1:], columns=rows[0]) if rows else pd.DataFrame()
+    # Columns without a header are padding, not data
+    return df.loc[:, df.columns != '']
+
+def _restore_numeric_columns(dataframe):
+    """Returns the DataFrame with text columns that hold only numbers (or blanks) converted to numeric."""
+    converted = {}
+    for col in dataframe.columns[dataframe.dtypes == object]:
+        try:
+            converted[col] = pd.to_numeric(dataframe[col].replace('', np.nan))
+        except (ValueError, TypeError):
+            continue # Not a numeric column
+    if not converted:
+        return dataframe
+    dataframe = dataframe.copy()
+    for col, values in converted.items():
+        dataframe[col] = values
+    return dataframe
+
+def _to_cell_data(value):
+    """Converts a DataFrame cell into a CellData dict for an updateCells request."""
+    value = _to_sheet_value(value)
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    if value == "":
+        return {} # Blank cell
+    if value.startswith("="):
+        return {"userEnteredValue": {"formulaValue": value}} # As USER_ENTERED input would treat it
+    return {"userEnteredValue": {"stringValue": value}}
+
+def _disk_cache_path(main_sheet_name, worksheet_name):
+    """Returns the on-disk cache file for a worksheet."""
+    key = hashlib.sha1(f"{main_sheet_name}\0{worksheet_name}".encode("utf-8")).hexdigest()
+    return os.path.join(SHEET_DISK_CACHE_DIR, f"{key}.json")
+
+def _load_disk_rows(main_sheet_name, worksheet_name, modified_time):
+    """Returns a worksheet's cached rows if they were saved at the spreadsheet's current modifiedTime, else None."""
     try:
-        if not os.path.exists(SERVICE_ACCOUNT_PATH):
-            raise FileNotFoundError(f"Service account JSON not found at: {SERVICE_ACCOUNT_PATH}")
-        
-        # print(f"DEBUG: Attempting to load service account from: {SERVICE_ACCOUNT_PATH}")
-        gc = gspread.service_account(filename=SERVICE_ACCOUNT_PATH) 
-        # print(f"DEBUG: Service account loaded successfully.")
-        return gc
-    except FileNotFoundError as e:
-        print(f"ERROR: {e}")
-        print("Please ensure your Google Sheets service account JSON key file is correctly named and located.")
+        with open(_disk_cache_path(main_sheet_name, worksheet_name), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
         return None
-    except Exception as e:
-        print(f"ERROR: Failed to authenticate with Google Sheets: {type(e).__name__}: {e}")
-        print("Ensure Google Drive API and Google Sheets API are enabled in your GCP project.")
+    if cached.get("modified_time") != modified_time:
         return None
+    return cached.get("rows")
+
+def _save_disk_rows(main_sheet_name, worksheet_name, modified_time, rows):
+    """
+    Saves a worksheet's rows to the on-disk cache, tagged with the spreadsheet's modifiedTime.
+    Like the token cache, the directory and files are readable by the current user only.
+    """
+    path = _disk_cache_path(main_sheet_name, worksheet_name)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        os.makedirs(SHEET_DISK_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"modified_time": modified_time, "rows": rows}, f)
+        os.replace(tmp_path, path) # Atomic, so concurrent readers never see a half-written file
+    except OSError as e:
+        print(f"WARNING: Could not write sheet cache for '{worksheet_name}' to {path}: {e}")
 
 # --- Main Functions for Sheets Interaction ---
 
 def get_sheet_data(main_sheet_name, worksheet_name, retries=3, delay=5):
     """
     Retrieves data from a specified worksheet within a Google Sheet as a pandas DataFrame.
+    Results are cached in-process for SHEET_CACHE_TTL_SECONDS; callers get their own copy.
+    Across runs, the worksheet is only downloaded again if the spreadsheet has been modified.
     """
+    cache_key = (main_sheet_name, worksheet_name)
+    with _sheet_cache_lock:
+        cached_df = _sheet_cache.get(cache_key)
+    if cached_df is not None:
+        return cached_df.copy()
+
     gc = _get_gspread_client()
     if not gc:
         return pd.DataFrame()
@@ -42,16 +216,25 @@ def get_sheet_data(main_sheet_name, worksheet_name, retries=3, delay=5):
     for attempt in range(retries):
         try:
             # print(f"DEBUG: Attempting to open spreadsheet: '{main_sheet_name}' (Attempt {attempt + 1}/{retries})")
-            spreadsheet = gc.open(main_sheet_name)
+            spreadsheet = _open_spreadsheet(gc, main_sheet_name)
             # print(f"DEBUG: Spreadsheet '{main_sheet_name}' opened successfully.")
             
-            # print(f"DEBUG: Attempting to find worksheet: '{worksheet_name}'")
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            # print(f"DEBUG: Found worksheet: '{worksheet_name}'")
-            
-            df = get_as_dataframe(worksheet)
+            # A cheap Drive metadata call tells us whether the copy saved by an earlier run is still current
+            modified_time = spreadsheet.get_lastUpdateTime()
+            rows = _load_disk_rows(main_sheet_name, worksheet_name, modified_time)
+            if rows is None:
+                # print(f"DEBUG: Attempting to find worksheet: '{worksheet_name}'")
+                worksheet = spreadsheet.worksheet(worksheet_name)
+                # print(f"DEBUG: Found worksheet: '{worksheet_name}'")
+                
+                # One values.get call; the API trims trailing empty rows/columns for us
+                rows = worksheet.get_all_values()
+                _save_disk_rows(main_sheet_name, worksheet_name, modified_time, rows)
+            df = _values_to_dataframe(rows)
             # print(f"DEBUG: Data retrieved from worksheet '{worksheet_name}' successfully.")
-            return df
+            with _sheet_cache_lock:
+                _sheet_cache[cache_key] = df
+            return df.copy()
         except gspread.exceptions.SpreadsheetNotFound:
             print(f"ERROR: Spreadsheet '{main_sheet_name}' not found. Please create it and share with service account.")
             return pd.DataFrame() # Permanent error, no need to retry
@@ -71,19 +254,98 @@ def get_sheet_data(main_sheet_name, worksheet_name, retries=3, delay=5):
             return pd.DataFrame()
     return pd.DataFrame() # Should not be reached
 
+def get_multi_sheet_data(main_sheet_name, worksheet_names, retries=3, delay=5):
+    """
+    Retrieves several worksheets from the same Google Sheet with a single values.batchGet call.
+    Worksheets already in the get_sheet_data caches (in-process or on disk) are served from them and not re-fetched.
+    A worksheet that doesn't exist only loses its own DataFrame; the others are still read.
+
+    Args:
+        main_sheet_name (str): Name of the Google Sheet.
+        worksheet_names (list): Worksheet (tab) names to read.
+
+    Returns:
+        dict: Maps each requested worksheet name to its DataFrame (empty if it couldn't be read).
+    """
+    frames = {}
+    with _sheet_cache_lock:
+        for worksheet_name in worksheet_names:
+            cached_df = _sheet_cache.get((main_sheet_name, worksheet_name))
+            if cached_df is not None:
+                frames[worksheet_name] = cached_df.copy()
+    missing = [name for name in dict.fromkeys(worksheet_names) if name not in frames]
+    if not missing:
+        return frames
+
+    gc = _get_gspread_client()
+    if not gc:
+        return {name: frames.get(name, pd.DataFrame()) for name in worksheet_names}
+
+    for attempt in range(retries):
+        try:
+            spreadsheet = _open_spreadsheet(gc, main_sheet_name)
+            modified_time = spreadsheet.get_lastUpdateTime()
+            fetched = {name: _load_disk_rows(main_sheet_name, name, modified_time) for name in missing}
+            to_download = [name for name, rows in fetched.items() if rows is None]
+            if to_download:
+                # One unknown tab makes the whole batchGet fail with a 400, so only existing tabs are requested
+                existing_titles = {worksheet.title for worksheet in spreadsheet.worksheets()}
+                for worksheet_name in to_download:
+                    if worksheet_name not in existing_titles:
+                        print(f"ERROR: Worksheet '{worksheet_name}' not found in '{main_sheet_name}'.")
+                to_download = [name for name in to_download if name in existing_titles]
+            if to_download:
+                response = spreadsheet.values_batch_get([absolute_range_name(name) for name in to_download])
+                # valueRanges come back in request order
+                for worksheet_name, value_range in zip(to_download, response.get('valueRanges', [])):
+                    fetched[worksheet_name] = value_range.get('values', [])
+                    _save_disk_rows(main_sheet_name, worksheet_name, modified_time, fetched[worksheet_name])
+
+            for worksheet_name, rows in fetched.items():
+                if rows is None:
+                    continue
+                # Rows from batchGet are ragged, so pad them before framing
+                df = _values_to_dataframe(fill_gaps(rows)) if rows else pd.DataFrame()
+                with _sheet_cache_lock:
+                    _sheet_cache[(main_sheet_name, worksheet_name)] = df
+                frames[worksheet_name] = df.copy()
+            break
+        except gspread.exceptions.SpreadsheetNotFound:
+            print(f"ERROR: Spreadsheet '{main_sheet_name}' not found. Please create it and share with service account.")
+            break # Permanent error, no need to retry
+        except gspread.exceptions.APIError as e:
+            if e.response.status_code == 400: # Bad request (e.g. an unparseable range); retrying won't help
+                print(f"CRITICAL GOOGLE SHEETS API ERROR for {missing}: {e}")
+                _print_gspread_api_hints(main_sheet_name)
+                break # Permanent error, no need to retry
+            if attempt < retries - 1:
+                print(f"WARNING: Google Sheets API error during get_multi_sheet_data (Attempt {attempt + 1}/{retries}): {e}. Retrying in {delay} seconds...")
+                time.sleep(delay)
+            else:
+                print(f"CRITICAL GOOGLE SHEETS API ERROR after {retries} attempts for {missing}: {e}")
+                _print_gspread_api_hints(main_sheet_name)
+        except Exception as e:
+            print(f"UNEXPECTED ERROR during get_multi_sheet_data for {missing}: {type(e).__name__}: {e}")
+            break
+    return {name: frames.get(name, pd.DataFrame()) for name in worksheet_names}
+
 def update_sheet_data(dataframe, main_sheet_name, worksheet_name, retries=3, delay=5, clear_sheet=True):
     """
     Uploads/updates a pandas DataFrame to a specified Google Sheet worksheet.
-    If clear_sheet is True, existing data in the worksheet will be cleared before upload.
+    If clear_sheet is True, any existing data outside the uploaded range is cleared in the same request.
     """
     gc = _get_gspread_client()
     if not gc:
         return
 
+    # Any cached copy of this worksheet is stale once we start writing to it
+    with _sheet_cache_lock:
+        _sheet_cache.pop((main_sheet_name, worksheet_name), None)
+
     for attempt in range(retries):
         try:
             # print(f"DEBUG: Attempting to open spreadsheet: '{main_sheet_name}' (Attempt {attempt + 1}/{retries})")
-            spreadsheet = gc.open(main_sheet_name)
+            spreadsheet = _open_spreadsheet(gc, main_sheet_name)
             # print(f"DEBUG: Spreadsheet '{main_sheet_name}' opened successfully.")
             
             # Get or create the worksheet
@@ -96,13 +358,38 @@ def update_sheet_data(dataframe, main_sheet_name, worksheet_name, retries=3, del
                 worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=str(dataframe.shape[0] + 100), cols=str(dataframe.shape[1] + 10)) # Adjust rows/cols dynamically
                 # print(f"DEBUG: Created new worksheet: '{worksheet_name}' successfully.")
 
-            if clear_sheet:
-                # print(f"DEBUG: Clearing existing data in worksheet '{worksheet_name}'...")
-                worksheet.clear()
-                # print(f"DEBUG: Data cleared.")
+            # get_sheet_data returns every cell as a string; numeric columns are converted back so they
+            # are stored as numbers again rather than as text
+            values = _dataframe_to_values(_restore_numeric_columns(dataframe))
+            n_rows, n_cols = len(values), len(values[0])
 
             # print(f"DEBUG: Uploading DataFrame to worksheet '{worksheet_name}'...")
-            set_with_dataframe(worksheet, dataframe)
+            if clear_sheet:
+                # One batchUpdate both writes and clears: an updateCells request over the whole sheet sets
+                # every cell, leaving the ones the frame doesn't cover empty (as upload_to_sheets does).
+                # The grid is grown in the same request if the frame doesn't fit.
+                requests = []
+                if n_rows > worksheet.row_count:
+                    requests.append({"appendDimension": {"sheetId": worksheet.id, "dimension": "ROWS", "length": n_rows - worksheet.row_count}})
+                if n_cols > worksheet.col_count:
+                    requests.append({"appendDimension": {"sheetId": worksheet.id, "dimension": "COLUMNS", "length": n_cols - worksheet.col_count}})
+                requests.append({
+                    "updateCells": {
+                        "range": {"sheetId": worksheet.id},
+                        "rows": [{"values": [_to_cell_data(value) for value in row]} for row in values],
+                        "fields": "userEnteredValue",
+                    }
+                })
+                spreadsheet.batch_update({"requests": requests})
+            else:
+                # Grow the grid first if the DataFrame doesn't fit; the values API won't write past it
+                if n_rows > worksheet.row_count or n_cols > worksheet.col_count:
+                    worksheet.resize(rows=max(n_rows, worksheet.row_count), cols=max(n_cols, worksheet.col_count))
+                # Cells outside the frame are left as they are
+                spreadsheet.values_batch_update({
+                    "valueInputOption": "USER_ENTERED",
+                    "data": [{"range": absolute_range_name(worksheet_name, "A1"), "values": values}],
+                })
             print(f"Successfully uploaded data to Google Sheet '{main_sheet_name}', worksheet '{worksheet_name}'")
             return # Success, exit function
         except gspread.exceptions.APIError as e:
@@ -117,6 +404,71 @@ def update_sheet_data(dataframe, main_sheet_name, worksheet_name, retries=3, del
             print(f"UNEXPECTED ERROR during Google Sheets upload for '{worksheet_name}': {type(e).__name__}: {e}")
             return
 
+def update_sheet_columns(dataframe, main_sheet_name, worksheet_name, columns, retries=3, delay=5):
+    """
+    Writes only the given DataFrame columns (header + values) to an existing worksheet in one values.batchUpdate.
+    Columns already on the sheet are overwritten in place; new ones are appended after the last used column.
+    DataFrame rows must line up with the sheet's rows, as they do for a DataFrame read with get_sheet_data.
+
+    Args:
+        dataframe (pd.DataFrame): The DataFrame holding the columns to write.
+        main_sheet_name (str): Name of the Google Sheet.
+        worksheet_name (str): Name of the worksheet (tab) to write to.
+        columns (list): Names of the DataFrame columns to write.
+    """
+    gc = _get_gspread_client()
+    if not gc:
+        return
+
+    cache_key = (main_sheet_name, worksheet_name)
+    # Any cached copy of this worksheet is stale once we start writing to it
+    with _sheet_cache_lock:
+        _sheet_cache.pop(cache_key, None)
+
+    for attempt in range(retries):
+        try:
+            spreadsheet = _open_spreadsheet(gc, main_sheet_name)
+            worksheet = spreadsheet.worksheet(worksheet_name)
+
+            # Locate each column by its header; unknown columns go after the last used column
+            header = worksheet.row_values(1)
+            next_col = len(header) + 1
+            positions = {}
+            for col in columns:
+                if col in header:
+                    positions[col] = header.index(col) + 1
+                else:
+                    positions[col] = next_col
+                    next_col += 1
+
+            n_rows = len(dataframe) + 1 # Header row + data rows
+            max_col = max(positions.values())
+            if n_rows > worksheet.row_count or max_col > worksheet.col_count:
+                worksheet.resize(rows=max(n_rows, worksheet.row_count), cols=max(max_col, worksheet.col_count))
+
+            data = []
+            for col in columns:
+                column_values = [[str(col)]] + [[_to_sheet_value(value)] for value in dataframe[col].tolist()]
+                a1_range = f"{rowcol_to_a1(1, positions[col])}:{rowcol_to_a1(n_rows, positions[col])}"
+                data.append({"range": absolute_range_name(worksheet_name, a1_range), "values": column_values})
+            spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": data}) # Parsed like update_sheet_data
+            print(f"Successfully updated columns {list(columns)} in Google Sheet '{main_sheet_name}', worksheet '{worksheet_name}'")
+            return # Success, exit function
+        except gspread.exceptions.WorksheetNotFound:
+            print(f"ERROR: Worksheet '{worksheet_name}' not found in '{main_sheet_name}'.")
+            return # Permanent error, no need to retry
+        except gspread.exceptions.APIError as e:
+            if attempt < retries - 1:
+                print(f"WARNING: Google Sheets API error during update_sheet_columns (Attempt {attempt + 1}/{retries}): {e}. Retrying in {delay} seconds...")
+                time.sleep(delay)
+            else:
+                print(f"CRITICAL GOOGLE SHEETS API ERROR after {retries} attempts for '{worksheet_name}': {e}")
+                _print_gspread_api_hints(main_sheet_name)
+                return
+        except Exception as e:
+            print(f"UNEXPECTED ERROR during Google Sheets column update for '{worksheet_name}': {type(e).__name__}: {e}")
+            return
+
 def _print_gspread_api_hints(sheet_name):
     """Helper to print common gspread API error hints."""
     print("Please ensure:")
@@ -1,12 +1,37 @@
 from pytrends.request import TrendReq
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
 import time
 import random
 import os
+import threading
+
+from rate_limiter import TokenBucket
 
 # --- 1. Initialize pytrends ---
-pytrends = TrendReq(hl='en-US', tz=330) # hl=host language, tz=timezone (330 for India, 360 for US Central, etc.)
+# TrendReq's requests session isn't thread-safe, so each worker thread lazily creates and keeps its own
+_tls = threading.local()
+
+def _trends():
+    """Returns this thread's TrendReq, creating it on first use."""
+    if not hasattr(_tls, 'pytrends'):
+        _tls.pytrends = TrendReq(hl='en-US', tz=330) # hl=host language, tz=timezone (330 for India, 360 for US Central, etc.)
+    return _tls.pytrends
+
+# Requests are spread over a small worker pool but paced by one shared token bucket
+# (one request every ~6 seconds, bursts of 2) to stay under Trends' per-IP limits.
+TRENDS_MAX_WORKERS = 2
+TRENDS_RATE_LIMITER = TokenBucket(rate=1/6.0, capacity=2)
+TRENDS_MAX_RETRIES = 5
+TRENDS_MAX_BACKOFF_SECONDS = 60
+
+# Outputs are written as snappy-compressed Parquet, which keeps dtypes (e.g. the 'date' column)
+# and is what trend_predictor.py reads back. Set WRITE_DEBUG_CSV to also write a human-readable
+# gzip CSV copy, streamed in row chunks to keep peak memory flat.
+WRITE_DEBUG_CSV = False
+CSV_CHUNK_ROWS = 10_000
 
 # --- 2. Define Search Parameters ---
 GOOGLE_TRENDS_KEYWORDS = [
@@ -30,6 +55,10 @@ GOOGLE_TRENDS_KEYWORDS = [
     "eco friendly products"
 ]
 
+# Google Trends allows a maximum of 5 keywords per request; the default keyword list is chunked once here
+KEYWORDS_PER_REQUEST = 5
+KEYWORD_CHUNKS = tuple(tuple(GOOGLE_TRENDS_KEYWORDS[i:i + KEYWORDS_PER_REQUEST]) for i in range(0, len(GOOGLE_TRENDS_KEYWORDS), KEYWORDS_PER_REQUEST))
+
 # Timeframe for "Interest Over Time"
 # Examples: 'today 1-H', 'today 5-y', '2016-12-14 2017-01-25'
 TIMEFRAME = 'today 3-m' # Last 3 months for recent trends
@@ -38,49 +67,83 @@ TIMEFRAME = 'today 3-m' # Last 3 months for recent trends
 # Examples: 'US', 'IN' (India), 'GB' (United Kingdom)
 GEO = 'IN' # Let's target India for example, change to '' for worldwide
 
+def _fetch_with_backoff(fetch, description):
+    """
+    Calls fetch() under the shared rate limiter, retrying failures (typically HTTP 429)
+    with capped exponential backoff.
+
+    Args:
+        fetch (callable): Zero-argument function performing the Trends request(s).
+        description (str): Human-readable label used in log messages.
+
+    Returns:
+        The value returned by fetch(), or None if every attempt failed.
+    """
+    for attempt in range(TRENDS_MAX_RETRIES):
+        TRENDS_RATE_LIMITER.acquire()
+        try:
+            return fetch()
+        except Exception as e:
+            if attempt == TRENDS_MAX_RETRIES - 1:
+                print(f"    Error fetching {description} after {TRENDS_MAX_RETRIES} attempts: {e}")
+                return None
+            wait = min(TRENDS_MAX_BACKOFF_SECONDS, 2 ** attempt + random.random())
+            print(f"    Error fetching {description}: {e}. Retrying in {wait:.1f} seconds...")
+            time.sleep(wait)
+
+def _fetch_interest_chunk(chunk, timeframe, geo):
+    """Fetches 'Interest Over Time' for one chunk of up to 5 keywords."""
+    print(f"  Requesting data for: {', '.join(chunk)}")
+    pytrends = _trends()
+
+    def fetch():
+        pytrends.build_payload(list(chunk), cat=0, timeframe=timeframe, geo=geo)
+        return pytrends.interest_over_time()
+
+    df = _fetch_with_backoff(fetch, f"interest over time for {', '.join(chunk)}")
+    if df is None:
+        return None
+    if df.empty:
+        print(f"    No data returned for keywords: {', '.join(chunk)}")
+        return None
+    # Remove the 'isPartial' column if it exists
+    if 'isPartial' in df.columns:
+        df = df.drop(columns=['isPartial'])
+    # Interest scores are 0-100, so store them as the narrowest integer type (int8) rather than int64
+    df = df.apply(pd.to_numeric, downcast='integer')
+    df['geo'] = geo
+    df['timeframe'] = timeframe
+    return df
+
 def get_interest_over_time(keywords, timeframe=TIMEFRAME, geo=GEO):
     """
     Fetches Google Trends 'Interest Over Time' for a list of keywords.
     Google Trends allows a maximum of 5 keywords per request.
     """
-    all_interest_data = []
-    
-    # Split keywords into chunks of 5
-    keyword_chunks = [keywords[i:i + 5] for i in range(0, len(keywords), 5)]
+    # Split keywords into chunks of 5 (precomputed for the default keyword list)
+    if keywords is GOOGLE_TRENDS_KEYWORDS:
+        keyword_chunks = KEYWORD_CHUNKS
+    else:
+        keyword_chunks = tuple(tuple(keywords[i:i + KEYWORDS_PER_REQUEST]) for i in range(0, len(keywords), KEYWORDS_PER_REQUEST))
 
     print(f"Fetching Google Trends 'Interest Over Time' for {len(keywords)} keywords ({TIMEFRAME}, Geo: {GEO})...")
 
-    for chunk in keyword_chunks:
-        print(f"  Requesting data for: {', '.join(chunk)}")
-        try:
-            pytrends.build_payload(chunk, cat=0, timeframe=timeframe, geo=geo)
-            df = pytrends.interest_over_time()
-            if not df.empty:
-                # Remove the 'isPartial' column if it exists
-                if 'isPartial' in df.columns:
-                    df = df.drop(columns=['isPartial'])
-                df['geo'] = geo
-                df['timeframe'] = timeframe
-                all_interest_data.append(df)
-            else:
-                print(f"    No data returned for keywords: {', '.join(chunk)}")
-            time.sleep(random.randint(5, 10)) # Be polite to Google Trends
-        except Exception as e:
-            print(f"    Error fetching interest over time for {', '.join(chunk)}: {e}")
-            print("    Waiting longer due to potential rate limit or error...")
-            time.sleep(random.randint(30, 60)) # Longer wait for errors
+    # executor.map keeps the chunk order, so the keyword columns come out in input order
+    with ThreadPoolExecutor(max_workers=TRENDS_MAX_WORKERS) as executor:
+        results = executor.map(partial(_fetch_interest_chunk, timeframe=timeframe, geo=geo), keyword_chunks)
+        all_interest_data = [df for df in results if df is not None]
 
     if all_interest_data:
-        # Concatenate all dataframes. The 'date' column will be the index.
-        # Ensure the 'date' column is explicitly reset for sheets upload.
-        combined_df = pd.concat(all_interest_data, axis=1)
-        # Drop duplicate columns that might arise from concat (e.g., if a keyword chunk overlaps somehow, though it shouldn't with slicing)
-        combined_df = combined_df.loc[:,~combined_df.columns.duplicated()].copy()
-        
-        # Move geo and timeframe columns to the front and ensure 'date' is a column
-        if 'geo' in combined_df.columns and 'timeframe' in combined_df.columns:
-            cols = ['geo', 'timeframe'] + [col for col in combined_df.columns if col not in ['geo', 'timeframe']]
-            combined_df = combined_df[cols]
+        # Collect each column once (first chunk wins for the shared geo/timeframe columns),
+        # then build the frame in a single allocation. The 'date' index is aligned across chunks.
+        columns = {}
+        for df in all_interest_data:
+            for col in df.columns:
+                columns.setdefault(col, df[col])
+
+        # Put geo and timeframe first
+        front = {col: columns[col] for col in ('geo', 'timeframe') if col in columns}
+        combined_df = pd.DataFrame({**front, **columns})
         
         # Reset index to make 'date' a regular column for CSV/Sheets
         combined_df = combined_df.reset_index()
@@ -89,58 +152,89 @@ def get_interest_over_time(keywords, timeframe=TIMEFRAME, geo=GEO):
         return combined_df
     return pd.DataFrame()
 
+def _fetch_related(keyword, timeframe, geo):
+    """
+    Fetches 'Related Queries' and 'Related Topics' for a single keyword.
+
+    Returns:
+        tuple: (queries_df, topics_df); either may be None if nothing was found.
+    """
+    print(f"  Requesting related data for: '{keyword}'")
+    pytrends = _trends()
+
+    def fetch():
+        pytrends.build_payload([keyword], cat=0, timeframe=timeframe, geo=geo)
+        return pytrends.related_queries(), pytrends.related_topics()
+
+    result = _fetch_with_backoff(fetch, f"related data for '{keyword}'")
+    if result is None:
+        return None, None
+    related_queries_dict, related_topics_dict = result
+
+    # Related Queries
+    df_queries = None
+    if related_queries_dict and keyword in related_queries_dict and related_queries_dict[keyword]['top'] is not None:
+        df_queries = related_queries_dict[keyword]['top']
+    else:
+        print(f"    No top related queries found for '{keyword}'")
+
+    # Related Topics
+    df_topics = None
+    if related_topics_dict and keyword in related_topics_dict and related_topics_dict[keyword]['top'] is not None:
+        df_topics = related_topics_dict[keyword]['top']
+    else:
+        print(f"    No top related topics found for '{keyword}'")
+
+    return df_queries, df_topics
+
+def _combine_related(pairs, type_column, timeframe, geo):
+    """
+    Concatenates per-keyword related queries/topics once, attaching the metadata columns afterwards.
+
+    Args:
+        pairs (list): (keyword, DataFrame) tuples in keyword order.
+        type_column (str): Name of the column recording the result type ('query_type' or 'topic_type').
+    """
+    combined_df = pd.concat([df for _, df in pairs], keys=[keyword for keyword, _ in pairs], names=['keyword_searched'], copy=False)
+    combined_df = combined_df.reset_index(level='keyword_searched').reset_index(drop=True)
+    combined_df[type_column] = 'top'
+    combined_df['geo'] = geo
+    combined_df['timeframe'] = timeframe
+    return combined_df
+
 def get_related_queries_and_topics(keywords, timeframe=TIMEFRAME, geo=GEO):
     """
     Fetches Google Trends 'Related Queries' and 'Related Topics' for individual keywords.
     This works best for single keywords.
     """
-    all_related_queries = []
-    all_related_topics = []
-
     print(f"\nFetching Google Trends 'Related Queries' and 'Related Topics' for {len(keywords)} keywords ({TIMEFRAME}, Geo: {GEO})...")
 
-    for keyword in keywords:
-        print(f"  Requesting related data for: '{keyword}'")
-        try:
-            pytrends.build_payload([keyword], cat=0, timeframe=timeframe, geo=geo)
-            
-            # Related Queries
-            related_queries_dict = pytrends.related_queries()
-            if related_queries_dict and keyword in related_queries_dict and related_queries_dict[keyword]['top'] is not None:
-                df_queries = related_queries_dict[keyword]['top']
-                df_queries['keyword_searched'] = keyword
-                df_queries['query_type'] = 'top'
-                df_queries['geo'] = geo
-                df_queries['timeframe'] = timeframe
-                all_related_queries.append(df_queries)
-            else:
-                print(f"    No top related queries found for '{keyword}'")
-
-            # Related Topics
-            related_topics_dict = pytrends.related_topics()
-            if related_topics_dict and keyword in related_topics_dict and related_topics_dict[keyword]['top'] is not None:
-                df_topics = related_topics_dict[keyword]['top']
-                df_topics['keyword_searched'] = keyword
-                df_topics['topic_type'] = 'top'
-                df_topics['geo'] = geo
-                df_topics['timeframe'] = timeframe
-                all_related_topics.append(df_topics)
-            else:
-                print(f"    No top related topics found for '{keyword}'")
-                
-            time.sleep(random.randint(10, 20)) # Be more polite for related queries/topics
+    with ThreadPoolExecutor(max_workers=TRENDS_MAX_WORKERS) as executor:
+        results = list(executor.map(partial(_fetch_related, timeframe=timeframe, geo=geo), keywords))
 
-        except Exception as e:
-            print(f"    Error fetching related data for '{keyword}': {e}")
-            print("    Waiting longer due to potential rate limit or error...")
-            time.sleep(random.randint(60, 120)) # Even longer wait for errors
+    query_pairs = [(keyword, df_queries) for keyword, (df_queries, _) in zip(keywords, results) if df_queries is not None]
+    topic_pairs = [(keyword, df_topics) for keyword, (_, df_topics) in zip(keywords, results) if df_topics is not None]
 
-    if all_related_queries:
-        combined_queries_df = pd.concat(all_related_queries, ignore_index=True)
-        return combined_queries_df, pd.concat(all_related_topics, ignore_index=True) if all_related_topics else pd.DataFrame()
+    if query_pairs:
+        combined_queries_df = _combine_related(query_pairs, 'query_type', timeframe, geo)
+        return combined_queries_df, _combine_related(topic_pairs, 'topic_type', timeframe, geo) if topic_pairs else pd.DataFrame()
     return pd.DataFrame(), pd.DataFrame()
 
 
+def _save_trends_output(df, base_name):
+    """
+    Saves a Trends DataFrame as '<base_name>.parquet' (plus '<base_name>.csv.gz' if WRITE_DEBUG_CSV is set).
+
+    Returns:
+        str: Path of the Parquet file.
+    """
+    parquet_path = f"{base_name}.parquet"
+    df.to_parquet(parquet_path, index=False, compression='snappy')
+    if WRITE_DEBUG_CSV:
+        df.to_csv(f"{base_name}.csv.gz", index=False, chunksize=CSV_CHUNK_ROWS, compression='gzip')
+    return parquet_path
+
+
 # --- Main Execution ---
 if __name__ == "__main__":
     
@@ -149,10 +243,9 @@ if __name__ == "__main__":
     # 1. Get Interest Over Time
     interest_over_time_df = get_interest_over_time(GOOGLE_TRENDS_KEYWORDS)
     if not interest_over_time_df.empty:
-        csv_path_iot = "google_trends_interest_over_time.csv"
-        interest_over_time_df.to_csv(csv_path_iot, index=False)
+        output_path_iot = _save_trends_output(interest_over_time_df, "google_trends_interest_over_time")
         print(f"\nSuccessfully extracted Interest Over Time data for {len(GOOGLE_TRENDS_KEYWORDS)} keywords.")
-        print(f"Data saved to {csv_path_iot}")
+        print(f"Data saved to {output_path_iot}")
         print("\nFirst 5 rows of Interest Over Time data:")
         print(interest_over_time_df.head())
 
@@ -172,10 +265,9 @@ if __name__ == "__main__":
     related_queries_df, related_topics_df = get_related_queries_and_topics(GOOGLE_TRENDS_KEYWORDS)
 
     if not related_queries_df.empty:
-        csv_path_rq = "google_trends_related_queries.csv"
-        related_queries_df.to_csv(csv_path_rq, index=False)
+        output_path_rq = _save_trends_output(related_queries_df, "google_trends_related_queries")
         print(f"\nSuccessfully extracted Related Queries data for {len(GOOGLE_TRENDS_KEYWORDS)} keywords.")
-        print(f"Data saved to {csv_path_rq}")
+        print(f"Data saved to {output_path_rq}")
         print("\nFirst 5 rows of Related Queries data:")
         print(related_queries_df.head())
 
@@ -192,10 +284,9 @@ if __name__ == "__main__":
         print("\nNo Related Queries data extracted.")
 
     if not related_topics_df.empty:
-        csv_path_rt = "google_trends_related_topics.csv"
-        related_topics_df.to_csv(csv_path_rt, index=False)
+        output_path_rt = _save_trends_output(related_topics_df, "google_trends_related_topics")
         print(f"\nSuccessfully extracted Related Topics data for {len(GOOGLE_TRENDS_KEYWORDS)} keywords.")
-        print(f"Data saved to {csv_path_rt}")
+        print(f"Data saved to {output_path_rt}")
         print("\nFirst 5 rows of Related Topics data:")
         print(related_topics_df.head())
 
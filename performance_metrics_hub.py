@@ -1,37 +1,79 @@
 # performance_metrics_hub.py
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
 
 # Import Google Sheets and Slack integration functions
-from google_sheets_handler import get_sheet_data
-from slack_notifier import send_slack_notification # Assuming your slack_notifier has this function
+from google_sheets_handler import get_multi_sheet_data
+from slack_notifier import send_slack_notifications
 
 # Define your main Google Spreadsheet name
 MAIN_SPREADSHEET_NAME = "AI_Content_Optimizer_Data" # <--- CONFIRM THIS
 
-def generate_sentiment_report_for_worksheet(worksheet_name, text_column, sentiment_label_col='sentiment_label', sentiment_score_col='sentiment_score'):
+# Labels written by sentiment_analyzer.py. Stored as a categorical, a label column is one int8 code per row.
+SENTIMENT_LABELS = ['Positive', 'Negative', 'Neutral', 'N/A']
+SENTIMENT_LABEL_DTYPE = pd.CategoricalDtype(categories=SENTIMENT_LABELS)
+
+def _label_codes(labels):
+    """Returns the SENTIMENT_LABELS index of each label as a numpy array (-1 for anything else)."""
+    return labels.astype(SENTIMENT_LABEL_DTYPE).cat.codes.to_numpy()
+
+# --- Batched Slack sender ---
+# Reports and alerts are collected while the report/alert loops run. flush_slack_notifications then
+# posts them with send_slack_notifications: each channel's messages in the order they were queued,
+# the channels concurrently (over one HTTP/2 connection when httpx and h2 are installed).
+_pending_slack_notifications = {}
+
+def _queue_slack_notification(message, channel):
+    """Queues a Slack notification to be sent by the next flush_slack_notifications call."""
+    _pending_slack_notifications.setdefault(channel, []).append(message)
+
+def flush_slack_notifications():
+    """Sends every queued Slack notification, in order within each channel."""
+    messages_by_channel = dict(_pending_slack_notifications)
+    _pending_slack_notifications.clear()
+    if not messages_by_channel:
+        return
+    try:
+        send_slack_notifications(messages_by_channel)
+    except Exception as e:
+        print(f"Error sending queued Slack notifications to {list(messages_by_channel)}: {e}")
+
+def _top_k_indices(values, k):
+    """Returns the indices of the k largest values, largest first."""
+    k = min(k, values.size)
+    if k == 0:
+        return np.empty(0, dtype=int)
+    idx = np.argpartition(-values, k - 1)[:k]
+    return idx[np.argsort(-values[idx], kind='stable')]
+
+def generate_sentiment_report_for_worksheet(df, worksheet_name, text_column, sentiment_label_col='sentiment_label', sentiment_score_col='sentiment_score'):
     """
     Generates a sentiment summary report for a specific worksheet.
+
+    Args:
+        df (pd.DataFrame): The worksheet's data, as returned by get_multi_sheet_data.
+        worksheet_name (str): Name of the worksheet, used in the report title.
+        text_column (str): Column holding the text shown for the top items.
     """
     print(f"\n--- Generating sentiment report for worksheet: '{worksheet_name}' ---")
-    df = get_sheet_data(MAIN_SPREADSHEET_NAME, worksheet_name)
 
     if df is not None and not df.empty and sentiment_label_col in df.columns and sentiment_score_col in df.columns:
-        # Drop unnamed columns that sometimes appear after reading from sheets
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-        
-        # Ensure sentiment_score is numeric
-        df[sentiment_score_col] = pd.to_numeric(df[sentiment_score_col], errors='coerce')
-        df.dropna(subset=[sentiment_score_col], inplace=True) # Remove rows where score couldn't be converted
+        # Coerce once and work on plain numpy arrays from here on
+        scores = pd.to_numeric(df[sentiment_score_col], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(scores) # Skip rows where score couldn't be converted
+        scores = scores[valid]
 
-        if df.empty:
+        if scores.size == 0:
             return f"No valid sentiment data found in '{worksheet_name}' for reporting."
 
-        total_entries = len(df)
-        avg_sentiment_score = df[sentiment_score_col].mean()
+        total_entries = scores.size
+        avg_sentiment_score = scores.mean()
 
-        sentiment_counts = df[sentiment_label_col].value_counts(normalize=True).reindex(['Positive', 'Negative', 'Neutral', 'N/A'], fill_value=0) * 100
+        codes = _label_codes(df[sentiment_label_col])[valid]
+        counts = np.bincount(codes[codes >= 0], minlength=len(SENTIMENT_LABELS))
+        sentiment_counts = dict(zip(SENTIMENT_LABELS, counts * 100.0 / total_entries))
 
         report_message = (
             f"📊 **Sentiment Report for {worksheet_name.replace('_', ' ').title()}**\n"
@@ -42,51 +84,55 @@ def generate_sentiment_report_for_worksheet(worksheet_name, text_column, sentime
             f"   - Neutral: `{sentiment_counts.get('Neutral', 0):.1f}%`\n"
         )
 
-        # Identify top positive/negative examples (optional, can be memory intensive for large data)
-        # For simplicity, let's get the 3 most positive and 3 most negative items
-        top_pos = df.nlargest(3, sentiment_score_col)
-        top_neg = df.nsmallest(3, sentiment_score_col)
+        # Identify the 3 most positive and 3 most negative items without sorting the whole column
+        texts = df[text_column].to_numpy()[valid]
+        top_pos = _top_k_indices(scores, 3)
+        top_neg = _top_k_indices(-scores, 3)
 
-        if not top_pos.empty:
+        if top_pos.size:
             report_message += "\n⭐ **Top 3 Positive Items:**\n"
-            for _, row in top_pos.iterrows():
-                content = str(row[text_column])[:100] + "..." if len(str(row[text_column])) > 100 else str(row[text_column])
-                report_message += f"   - `{content}` (Score: {row[sentiment_score_col]:.2f})\n"
+            for i in top_pos:
+                content = str(texts[i])[:100] + "..." if len(str(texts[i])) > 100 else str(texts[i])
+                report_message += f"   - `{content}` (Score: {scores[i]:.2f})\n"
         
-        if not top_neg.empty:
+        if top_neg.size:
             report_message += "\n🚨 **Top 3 Negative Items:**\n"
-            for _, row in top_neg.iterrows():
-                content = str(row[text_column])[:100] + "..." if len(str(row[text_column])) > 100 else str(row[text_column])
-                report_message += f"   - `{content}` (Score: {row[sentiment_score_col]:.2f})\n"
+            for i in top_neg:
+                content = str(texts[i])[:100] + "..." if len(str(texts[i])) > 100 else str(texts[i])
+                report_message += f"   - `{content}` (Score: {scores[i]:.2f})\n"
 
         return report_message
     else:
         return f"Could not generate report for '{worksheet_name}': Data empty or sentiment columns missing."
 
-def check_for_sentiment_alerts(worksheet_name, sentiment_label_col='sentiment_label', sentiment_score_col='sentiment_score', 
+def check_for_sentiment_alerts(df, worksheet_name, sentiment_label_col='sentiment_label', sentiment_score_col='sentiment_score', 
                                 negative_threshold=-0.5, negative_count_threshold=5, channel="#marketing-alerts"):
     """
     Checks for critical negative sentiment and sends a Slack alert if thresholds are met.
+    The alert is queued; call flush_slack_notifications() to send it.
+
+    Args:
+        df (pd.DataFrame): The worksheet's data, as returned by get_multi_sheet_data.
+        worksheet_name (str): Name of the worksheet, used in the alert message.
     """
     print(f"\n--- Checking for sentiment alerts in worksheet: '{worksheet_name}' ---")
-    df = get_sheet_data(MAIN_SPREADSHEET_NAME, worksheet_name)
 
     if df is not None and not df.empty and sentiment_label_col in df.columns and sentiment_score_col in df.columns:
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-        df[sentiment_score_col] = pd.to_numeric(df[sentiment_score_col], errors='coerce')
+        scores = pd.to_numeric(df[sentiment_score_col], errors='coerce').to_numpy(dtype=float)
         
-        # Filter for significantly negative content
-        negative_content = df[(df[sentiment_label_col] == 'Negative') & (df[sentiment_score_col] < negative_threshold)]
+        # Count significantly negative content straight off a boolean mask; no rows are copied
+        negative_mask = (_label_codes(df[sentiment_label_col]) == SENTIMENT_LABELS.index('Negative')) & (scores < negative_threshold)
+        negative_count = int(np.count_nonzero(negative_mask))
         
-        if len(negative_content) >= negative_count_threshold:
+        if negative_count >= negative_count_threshold:
             alert_message = (
                 f"🚨 **URGENT SENTIMENT ALERT in {worksheet_name.replace('_', ' ').title()}!**\n"
-                f"   - Detected `{len(negative_content)}` items with sentiment scores below `{negative_threshold}`.\n"
+                f"   - Detected `{negative_count}` items with sentiment scores below `{negative_threshold}`.\n"
                 f"   - This indicates a significant negative trend.\n"
                 f"   - Please review the latest data in the Google Sheet: [Link to your Google Sheet]\n"
             )
             print(f"Sending Slack alert for {worksheet_name}...")
-            send_slack_notification(alert_message, channel)
+            _queue_slack_notification(alert_message, channel)
             return alert_message
         else:
             print(f"No critical negative sentiment detected in '{worksheet_name}'.")
@@ -106,30 +152,51 @@ if __name__ == "__main__":
         "Reddit_Product_Content": {'text_col': 'selftext', 'slack_channel': "#marketing-reports"},
     }
 
+    # text_col selects which analyzed column's sentiment (sentiment_label_<text_col>) is checked
     alert_config = {
-        "Twitter_marketing_tweets": {'negative_threshold': -0.3, 'negative_count_threshold': 5, 'slack_channel': "#marketing-alerts"},
-        "YouTube_Product_Content": {'negative_threshold': -0.4, 'negative_count_threshold': 3, 'slack_channel': "#marketing-alerts"},
-        "Reddit_Product_Content": {'negative_threshold': -0.5, 'negative_count_threshold': 2, 'slack_channel': "#marketing-alerts"},
+        "Twitter_marketing_tweets": {'text_col': 'Tweet', 'negative_threshold': -0.3, 'negative_count_threshold': 5, 'slack_channel': "#marketing-alerts"},
+        "YouTube_Product_Content": {'text_col': 'title', 'negative_threshold': -0.4, 'negative_count_threshold': 3, 'slack_channel': "#marketing-alerts"},
+        "Reddit_Product_Content": {'text_col': 'selftext', 'negative_threshold': -0.5, 'negative_count_threshold': 2, 'slack_channel': "#marketing-alerts"},
     }
 
-    # --- Generate and Send Reports ---
-    print("\n--- Generating and sending daily reports ---")
-    for ws_name, config in reporting_config.items():
-        report = generate_sentiment_report_for_worksheet(ws_name, config['text_col'])
-        if report:
-            print(f"Sending report for {ws_name} to {config['slack_channel']}")
-            send_slack_notification(report, config['slack_channel'])
-        else:
-            print(f"Failed to generate report for {ws_name}.")
-
-    # --- Check for and Send Alerts ---
-    print("\n--- Checking for sentiment alerts ---")
-    for ws_name, config in alert_config.items():
-        check_for_sentiment_alerts(
-            ws_name, 
-            negative_threshold=config['negative_threshold'], 
-            negative_count_threshold=config['negative_count_threshold'], 
-            channel=config['slack_channel']
-        )
-    
+    # --- Fetch every worksheet in one batchGet; reports and alerts share the same DataFrame ---
+    worksheet_names = list(dict.fromkeys([*reporting_config, *alert_config]))
+    sheet_data = get_multi_sheet_data(MAIN_SPREADSHEET_NAME, worksheet_names)
+    # Cast the label columns once up front; the helpers' own cast is then a no-op
+    for df in sheet_data.values():
+        for col in df.columns:
+            if str(col).startswith('sentiment_label'):
+                df[col] = df[col].astype(SENTIMENT_LABEL_DTYPE)
+
+    # Whatever was queued still goes out if a report or alert check raises
+    try:
+        # --- Generate and Send Reports ---
+        print("\n--- Generating and sending daily reports ---")
+        for ws_name, config in reporting_config.items():
+            text_col = config['text_col']
+            report = generate_sentiment_report_for_worksheet(
+                sheet_data[ws_name], ws_name, text_col,
+                sentiment_label_col=f'sentiment_label_{text_col}', sentiment_score_col=f'sentiment_score_{text_col}'
+            )
+            if report:
+                print(f"Sending report for {ws_name} to {config['slack_channel']}")
+                _queue_slack_notification(report, config['slack_channel'])
+            else:
+                print(f"Failed to generate report for {ws_name}.")
+
+        # --- Check for and Send Alerts ---
+        print("\n--- Checking for sentiment alerts ---")
+        for ws_name, config in alert_config.items():
+            check_for_sentiment_alerts(
+                sheet_data[ws_name],
+                ws_name, 
+                sentiment_label_col=f"sentiment_label_{config['text_col']}",
+                sentiment_score_col=f"sentiment_score_{config['text_col']}",
+                negative_threshold=config['negative_threshold'], 
+                negative_count_threshold=config['negative_count_threshold'], 
+                channel=config['slack_channel']
+            )
+    finally:
+        # Every report and alert goes out here: in order within each channel, the channels concurrently
+        flush_slack_notifications()
     print("\nPerformance Metrics Hub completed.")
\ No newline at end of file
@@ -0,0 +1,31 @@
+# rate_limiter.py
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to pace calls to rate-limited APIs from worker threads.
+
+    Args:
+        rate (float): Tokens added per second (the sustained request rate).
+        capacity (int): Maximum number of tokens held, i.e. the largest allowed burst.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -1,10 +1,15 @@
 import praw
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import csv
 from datetime import datetime
-import time
-import random
+import queue
 import os
 
+from rate_limiter import TokenBucket
+
 # --- 1. Load API Credentials from credentials.py ---
 try:
     from credentials import REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USERNAME, REDDIT_PASSWORD
@@ -12,14 +17,35 @@ except ImportError:
     print("Error: Reddit API credentials not found in credentials.py. Please add them.")
     exit()
 
-# --- 2. Initialize PRAW Reddit Instance ---
-reddit = praw.Reddit(
-    client_id=REDDIT_CLIENT_ID,
-    client_secret=REDDIT_CLIENT_SECRET,
-    username=REDDIT_USERNAME,
-    password=REDDIT_PASSWORD,
-    user_agent="AI_Content_Optimizer_Bot_v1.0 (by /u/YOUR_REDDIT_USERNAME_HERE)" # Replace with your Reddit username
-)
+# --- 2. Initialize PRAW Reddit Instances ---
+# A Reddit instance (and its HTTP session) must not be used by two threads at once, so each
+# worker checks one out of a small pool. All of them share one token bucket that keeps the
+# total request rate within Reddit's 60 requests/minute per account.
+REDDIT_WORKERS = 4
+REDDIT_RATE_LIMITER = TokenBucket(rate=1.0, capacity=REDDIT_WORKERS)
+
+def _new_reddit():
+    """Creates an authenticated PRAW Reddit instance."""
+    return praw.Reddit(
+        client_id=REDDIT_CLIENT_ID,
+        client_secret=REDDIT_CLIENT_SECRET,
+        username=REDDIT_USERNAME,
+        password=REDDIT_PASSWORD,
+        user_agent="AI_Content_Optimizer_Bot_v1.0 (by /u/YOUR_REDDIT_USERNAME_HERE)" # Replace with your Reddit username
+    )
+
+_reddit_pool = queue.Queue()
+for _ in range(REDDIT_WORKERS):
+    _reddit_pool.put(_new_reddit())
+
+@contextmanager
+def _checkout_reddit():
+    """Borrows a Reddit instance from the pool for the duration of the with-block."""
+    reddit = _reddit_pool.get()
+    try:
+        yield reddit
+    finally:
+        _reddit_pool.put(reddit)
 
 # --- 3. Define Search Parameters ---
 # A list of subreddits to monitor for product-related content
@@ -54,52 +80,94 @@ LIMIT_PER_SUBREDDIT = 25 # How many posts to fetch from each subreddit (hot/new/
 LIMIT_PER_SEARCH_TERM = 25 # How many posts to fetch per general search term
 TIME_FILTER = "week" # 'day', 'week', 'month', 'year', 'all' for top/controversial posts
 
-def get_reddit_product_posts(subreddits, search_terms, limit_sub=LIMIT_PER_SUBREDDIT, limit_search=LIMIT_PER_SEARCH_TERM, time_filter=TIME_FILTER):
-    """
-    Fetches product-centric posts from specified subreddits and general searches on Reddit.
-    """
-    all_posts_data = []
-    seen_post_ids = set() # To prevent duplicate posts if they appear in multiple searches/subreddits
-
-    print(f"Starting Reddit data extraction...")
+OUTPUT_CSV_PATH = "reddit_product_marketing_posts.csv"
+# Column order of the output CSV; matches the keys returned by extract_submission_data
+REDDIT_FIELDS = [
+    "platform", "post_id", "title", "url", "selftext", "subreddit", "author", "score",
+    "upvote_ratio", "num_comments", "created_utc", "permalink", "is_original_content",
+    "is_video", "over_18", "distinguished", "source_category",
+]
 
-    # --- Fetch from specific subreddits (Top posts of the week) ---
-    print("\nFetching 'top' posts from target subreddits...")
-    for sub_name in subreddits:
-        print(f"  From r/{sub_name}")
-        try:
+def _fetch_subreddit_top(sub_name, limit, time_filter):
+    """Fetches and extracts the top posts of one subreddit. Runs on a worker thread."""
+    print(f"  From r/{sub_name}")
+    posts = []
+    try:
+        REDDIT_RATE_LIMITER.acquire()
+        with _checkout_reddit() as reddit:
             subreddit = reddit.subreddit(sub_name)
             # Fetch top posts for the last week
-            for submission in subreddit.top(limit=limit_sub, time_filter=time_filter):
-                if submission.id not in seen_post_ids:
-                    all_posts_data.append(extract_submission_data(submission, f"subreddit_top:{sub_name}"))
-                    seen_post_ids.add(submission.id)
-            time.sleep(random.randint(2, 5)) # Be polite
-        except Exception as e:
-            print(f"    Error fetching from r/{sub_name}: {e}")
+            for submission in subreddit.top(limit=limit, time_filter=time_filter):
+                posts.append(extract_submission_data(submission, f"subreddit_top:{sub_name}"))
+    except Exception as e:
+        print(f"    Error fetching from r/{sub_name}: {e}")
+    return posts # Posts read before an error are kept
 
-    # --- Perform general searches (e.g., in r/all or specific subreddits) ---
-    print("\nPerforming general searches across subreddits (using search terms)...")
-    for term in search_terms:
-        print(f"  Searching for: '{term}'")
-        try:
+def _fetch_search(term, limit):
+    """Runs one search across r/all and extracts the results. Runs on a worker thread."""
+    print(f"  Searching for: '{term}'")
+    posts = []
+    try:
+        REDDIT_RATE_LIMITER.acquire()
+        with _checkout_reddit() as reddit:
             # You can search `reddit.subreddit('all').search(term, ...)` for broader,
             # but it's often better to search within relevant subreddits or broad ones like `AskReddit`
             # For this example, let's search `r/all` for general terms.
             # Be cautious with 'all' as it can yield very broad results.
-            for submission in reddit.subreddit('all').search(term, sort='relevance', limit=limit_search, time_filter='week'):
-                if submission.id not in seen_post_ids:
-                    all_posts_data.append(extract_submission_data(submission, f"search_term:'{term}'"))
-                    seen_post_ids.add(submission.id)
-            time.sleep(random.randint(2, 5)) # Be polite
-        except Exception as e:
-            print(f"    Error searching for '{term}': {e}")
-    
-    return pd.DataFrame(all_posts_data)
+            for submission in reddit.subreddit('all').search(term, sort='relevance', limit=limit, time_filter='week'):
+                posts.append(extract_submission_data(submission, f"search_term:'{term}'"))
+    except Exception as e:
+        print(f"    Error searching for '{term}': {e}")
+    return posts # Posts read before an error are kept
+
+def get_reddit_product_posts(subreddits, search_terms, output_csv_path=OUTPUT_CSV_PATH, limit_sub=LIMIT_PER_SUBREDDIT, limit_search=LIMIT_PER_SEARCH_TERM, time_filter=TIME_FILTER):
+    """
+    Fetches product-centric posts from specified subreddits and general searches on Reddit.
+    Subreddit listings and searches run concurrently on REDDIT_WORKERS threads, and each unique
+    post is written to the output CSV as soon as it's merged rather than collected in memory.
+
+    Args:
+        subreddits (list): Subreddits whose top posts are fetched.
+        search_terms (list): Terms searched across r/all.
+        output_csv_path (str): CSV file the posts are written to (overwritten).
+
+    Returns:
+        int: Number of unique posts written.
+    """
+    # To prevent duplicate posts if they appear in multiple searches/subreddits. Reddit IDs are base-36,
+    # so they're stored as ints: exact (no false positives) and far smaller than the id strings.
+    seen_post_ids = set()
+
+    print(f"Starting Reddit data extraction...")
+    print("\nFetching 'top' posts from target subreddits and performing general searches (using search terms)...")
+
+    with open(output_csv_path, "w", newline="", encoding="utf-8") as f, \
+            ThreadPoolExecutor(max_workers=REDDIT_WORKERS) as executor:
+        writer = csv.DictWriter(f, fieldnames=REDDIT_FIELDS)
+        writer.writeheader()
+
+        futures = deque(executor.submit(_fetch_subreddit_top, sub_name, limit_sub, time_filter) for sub_name in subreddits)
+        futures.extend(executor.submit(_fetch_search, term, limit_search) for term in search_terms)
+
+        # Merge in submission order so the first source to find a post keeps it, as before.
+        # Futures are popped so each batch of posts can be freed once it's written.
+        while futures:
+            for post in futures.popleft().result():
+                if post is None:
+                    continue
+                post_key = int(post["post_id"], 36)
+                if post_key not in seen_post_ids:
+                    writer.writerow(post)
+                    seen_post_ids.add(post_key)
+
+    return len(seen_post_ids)
 
 def extract_submission_data(submission, source_identifier):
     """Helper function to extract relevant data from a PRAW Submission object."""
     try:
+        # Listing results already carry the author's name, so reading .name on the lazy Redditor
+        # makes no request; only other Redditor attributes would trigger a /user/<name>/about fetch.
+        author = submission.author
         return {
             "platform": "Reddit",
             "post_id": submission.id,
@@ -107,7 +175,7 @@ def extract_submission_data(submission, source_identifier):
             "url": submission.url,
             "selftext": submission.selftext, # The main text content of the post
             "subreddit": submission.subreddit.display_name,
-            "author": submission.author.name if submission.author else "[deleted]",
+            "author": author.name if author else "[deleted]",
             "score": submission.score, # Upvotes - Downvotes
             "upvote_ratio": submission.upvote_ratio,
             "num_comments": submission.num_comments,
@@ -126,24 +194,20 @@ def extract_submission_data(submission, source_identifier):
 # --- Main Execution ---
 if __name__ == "__main__":
     print("--- Starting Reddit Product Marketing Data Extraction ---")
-    reddit_posts_df = get_reddit_product_posts(TARGET_SUBREDDITS, REDDIT_PRODUCT_SEARCH_TERMS)
-
-    # Filter out any None entries from failed extractions
-    reddit_posts_df = reddit_posts_df.dropna(subset=['post_id'])
+    post_count = get_reddit_product_posts(TARGET_SUBREDDITS, REDDIT_PRODUCT_SEARCH_TERMS)
 
-    if not reddit_posts_df.empty:
-        output_csv_path = "reddit_product_marketing_posts.csv"
-        reddit_posts_df.to_csv(output_csv_path, index=False)
-        print(f"\nSuccessfully extracted {len(reddit_posts_df)} unique product-related Reddit posts.")
-        print(f"Data saved to {output_csv_path}")
+    if post_count:
+        print(f"\nSuccessfully extracted {post_count} unique product-related Reddit posts.")
+        print(f"Data saved to {OUTPUT_CSV_PATH}")
         print("\nFirst 5 rows of extracted data:")
-        print(reddit_posts_df.head())
+        print(pd.read_csv(OUTPUT_CSV_PATH, nrows=5))
 
         # --- Integrate with Google Sheets ---
         try:
             from upload_to_sheets import upload_to_google_sheet
             print("\nAttempting to upload data to Google Sheets...")
-            upload_to_google_sheet(reddit_posts_df, "AI_Content_Optimizer_Data", "Reddit_Product_Content")
+            # The worksheet is replaced in one request, so the saved CSV is read back whole for the upload
+            upload_to_google_sheet(pd.read_csv(OUTPUT_CSV_PATH), "AI_Content_Optimizer_Data", "Reddit_Product_Content")
         except ImportError:
             print("\nWarning: upload_to_sheets.py not found. Skipping Google Sheets upload.")
         except Exception as e:
@@ -160,7 +224,7 @@ if __name__ == "__main__":
     if send_slack_notification:
         slack_message = (
             f":sparkles: New Reddit product marketing posts found! :reddit:\n"
-            f"Extracted {len(reddit_posts_df)} unique product-related Reddit posts.\n"
+            f"Extracted {post_count} unique product-related Reddit posts.\n"
             f"Check the Google Sheet here: https://docs.google.com/spreadsheets/d/1aAdsgz9AagAOxkRSoxdaIaJ6N76U8G1xb4mPC-_h5HE/edit?usp=sharing\n" # IMPORTANT: Replace with actual link
             f"Worksheet: AI_Content_Optimizer_Data\n"
             f"Check: Reddit_Product_Content worksheet for the details."
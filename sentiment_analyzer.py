@@ -1,29 +1,131 @@
 # sentiment_analyzer.py
+import numpy as np
 import pandas as pd
 import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+from functools import lru_cache
+import importlib.util
 import os
+import pickle
 
 # Ensure VADER lexicon is downloaded and configured
 NLTK_DATA_PATH = os.path.join(os.path.expanduser("~"), "nltk_data") 
 if NLTK_DATA_PATH not in nltk.data.path:
     nltk.data.path.append(NLTK_DATA_PATH)
 
-try:
-    nltk.data.find('sentiment/vader_lexicon')
-except LookupError:
-    print(f"Downloading 'vader_lexicon' to {NLTK_DATA_PATH}...")
-    nltk.download('vader_lexicon', download_dir=NLTK_DATA_PATH)
-
 # Import your Google Sheets handler functions
 # Assuming google_sheets_handler.py is in the same directory
-from google_sheets_handler import get_sheet_data, update_sheet_data
+from google_sheets_handler import CACHE_DIR, get_sheet_data, update_sheet_columns
 
 # Define your main Google Spreadsheet name
 MAIN_SPREADSHEET_NAME = "AI_Content_Optimizer_Data" # <--- CONFIRM THIS IS YOUR MAIN SPREADSHEET NAME
 
+# The parsed VADER lexicon is pickled after the first load, so later processes skip re-parsing the
+# ~7,500-line lexicon text (and the NLTK data lookup). Keyed by NLTK version in case the lexicon changes.
+VADER_LEXICON_CACHE_PATH = os.path.join(CACHE_DIR, f"vader_lexicon-nltk{nltk.__version__}.pickle")
+
+def _ensure_vader_lexicon():
+    """Downloads the VADER lexicon into NLTK_DATA_PATH if NLTK can't find it."""
+    try:
+        nltk.data.find('sentiment/vader_lexicon')
+    except LookupError:
+        print(f"Downloading 'vader_lexicon' to {NLTK_DATA_PATH}...")
+        nltk.download('vader_lexicon', download_dir=NLTK_DATA_PATH)
+
+def _load_vader_analyzer():
+    """Creates the VADER analyzer, from the pickled lexicon when one has been saved."""
+    try:
+        with open(VADER_LEXICON_CACHE_PATH, "rb") as f:
+            lexicon = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        lexicon = None
+
+    if lexicon is not None:
+        # Same state SentimentIntensityAnalyzer.__init__ sets up, minus parsing the lexicon file
+        vader = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        vader.lexicon = lexicon
+        vader.constants = VaderConstants()
+        return vader
+
+    _ensure_vader_lexicon()
+    vader = SentimentIntensityAnalyzer()
+    tmp_path = f"{VADER_LEXICON_CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(vader.lexicon, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, VADER_LEXICON_CACHE_PATH) # Atomic, so concurrent processes never read a partial file
+    except OSError as e:
+        print(f"Warning: Could not cache the VADER lexicon: {e}")
+    return vader
+
 # Initialize VADER sentiment analyzer
-analyzer = SentimentIntensityAnalyzer()
+analyzer = _load_vader_analyzer()
+
+# Reposts and canned launch copy repeat across worksheets, so VADER scores are memoized per text.
+# Keys are only whitespace-stripped: VADER weighs capitalization, so lowercasing would change scores.
+VADER_CACHE_SIZE = 200_000
+
+@lru_cache(maxsize=VADER_CACHE_SIZE)
+def _vader_compound(text):
+    """Returns VADER's compound score for an already-stripped text."""
+    return analyzer.polarity_scores(text)['compound']
+
+# --- Optional ONNX sentiment backend ---
+# Set SENTIMENT_BACKEND = "onnx" to score columns with an int8-quantized DistilBERT SST-2 classifier
+# exported to ONNX (e.g. with optimum's ORTQuantizer), run in batches on onnxruntime's CPU provider.
+# Its score is P(positive) - P(negative), so it shares VADER's -1..1 range and label thresholds.
+# VADER stays the default and is used whenever the model or its packages aren't available.
+SENTIMENT_BACKEND = "vader"
+ONNX_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "sentiment.quant.onnx")
+ONNX_TOKENIZER_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+ONNX_BATCH_SIZE = 64
+
+# onnxruntime and transformers take seconds to import, so they're only imported once the ONNX
+# backend is actually used (see _onnx_scores); until then they're just checked for with find_spec.
+_onnx_session = None
+_onnx_tokenizer = None
+
+def _use_onnx_backend():
+    """Returns True if the ONNX backend is selected and usable."""
+    if SENTIMENT_BACKEND != "onnx":
+        return False
+    if importlib.util.find_spec("onnxruntime") is None or importlib.util.find_spec("transformers") is None:
+        print("Warning: onnxruntime/transformers not installed. Falling back to VADER sentiment.")
+        return False
+    if not os.path.exists(ONNX_MODEL_PATH):
+        print(f"Warning: ONNX sentiment model not found at {ONNX_MODEL_PATH}. Falling back to VADER sentiment.")
+        return False
+    return True
+
+def _onnx_scores(texts):
+    """
+    Scores texts with the ONNX classifier in batches of ONNX_BATCH_SIZE.
+
+    Args:
+        texts (np.ndarray): Non-empty strings to score.
+
+    Returns:
+        np.ndarray: P(positive) - P(negative) for each text.
+    """
+    global _onnx_session, _onnx_tokenizer
+    if _onnx_session is None:
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        _onnx_session = ort.InferenceSession(ONNX_MODEL_PATH, providers=["CPUExecutionProvider"])
+        _onnx_tokenizer = AutoTokenizer.from_pretrained(ONNX_TOKENIZER_NAME)
+    input_names = [model_input.name for model_input in _onnx_session.get_inputs()]
+
+    scores = np.empty(len(texts))
+    for start in range(0, len(texts), ONNX_BATCH_SIZE):
+        batch = texts[start:start + ONNX_BATCH_SIZE].tolist()
+        encoded = _onnx_tokenizer(batch, padding=True, truncation=True, return_tensors="np")
+        logits = _onnx_session.run(None, {name: encoded[name] for name in input_names})[0]
+        # Softmax over [negative, positive]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+        scores[start:start + len(batch)] = probs[:, 1] - probs[:, 0]
+    return scores
 
 def analyze_sentiment(text):
     """
@@ -33,8 +135,7 @@ def analyze_sentiment(text):
     if not isinstance(text, str) or not text.strip(): # Handle non-string or empty text
         return 'N/A', 0.0
 
-    vs = analyzer.polarity_scores(text)
-    compound_score = vs['compound']
+    compound_score = _vader_compound(text.strip())
 
     if compound_score >= 0.05:
         return 'Positive', compound_score
@@ -43,50 +144,93 @@ def analyze_sentiment(text):
     else:
         return 'Neutral', compound_score
 
-def process_sentiment_for_worksheet(worksheet_name, text_column):
+# Indexed by analyze_sentiment_column's int8 label codes; -1 (Negative) wraps to the last entry
+_SENTIMENT_LABEL_LOOKUP = np.array(['Neutral', 'Positive', 'N/A', 'Negative'], dtype=object)
+
+def analyze_sentiment_column(texts):
     """
-    Retrieves data from a Google Sheet worksheet, performs sentiment analysis
-    on a specified text column, and updates the worksheet with sentiment scores.
+    Analyzes a whole column of texts with VADER (or the ONNX backend, if selected),
+    using the same labels and thresholds as analyze_sentiment.
+
+    Args:
+        texts (pd.Series): The texts to analyze.
+
+    Returns:
+        tuple: (labels, scores) numpy arrays aligned with texts. Non-string or empty texts get 'N/A' and 0.0.
+    """
+    values = texts.to_numpy(dtype=object)
+    has_text = np.fromiter((isinstance(text, str) and bool(text.strip()) for text in values), dtype=bool, count=len(values))
+
+    scores = np.zeros(len(values))
+    if _use_onnx_backend():
+        scores[has_text] = _onnx_scores(values[has_text])
+    else:
+        # The VADER call itself is unavoidably per-text Python (memoized); everything around it is vectorized
+        scores[has_text] = [_vader_compound(text.strip()) for text in values[has_text]]
+
+    # Classify as int8 codes (0 Neutral, 1 Positive, -1 Negative, 2 N/A) and look the strings up once
+    codes = (scores >= 0.05).astype(np.int8) - (scores <= -0.05)
+    codes[~has_text] = 2
+    return _SENTIMENT_LABEL_LOOKUP[codes], scores
+
+def sentiment_column_names(text_column):
+    """Returns the (label, score) column names that hold the sentiment of text_column."""
+    return f'sentiment_label_{text_column}', f'sentiment_score_{text_column}'
+
+def process_sentiment_for_worksheet(worksheet_name, text_columns):
+    """
+    Retrieves data from a Google Sheet worksheet once, performs sentiment analysis
+    on each of the given text columns, and updates the worksheet with the sentiment
+    scores of all of them in a single write.
 
     Args:
         worksheet_name (str): The name of the worksheet within MAIN_SPREADSHEET_NAME.
-        text_column (str): The name of the column containing text to analyze.
+        text_columns (list): The names of the columns containing text to analyze. Each one gets
+                             its own 'sentiment_label_<column>' and 'sentiment_score_<column>' columns.
     """
-    print(f"\n--- Processing sentiment for worksheet: '{worksheet_name}' (column: '{text_column}') ---")
+    print(f"\n--- Processing sentiment for worksheet: '{worksheet_name}' (columns: {', '.join(text_columns)}) ---")
     df = get_sheet_data(MAIN_SPREADSHEET_NAME, worksheet_name)
 
     if df is not None and not df.empty:
-        # Drop unnamed columns that sometimes appear after reading from sheets
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-
-        if text_column in df.columns:
+        # Ignore leftover 'Unnamed: N' headers written by older get_as_dataframe round-trips
+        df = df.drop(columns=[col for col in df.columns if str(col).startswith('Unnamed')])
+
+        output_columns = []
+        for text_column in text_columns:
+            if text_column not in df.columns:
+                print(f"ERROR: Text column '{text_column}' not found in worksheet '{worksheet_name}'. Skipping sentiment analysis for it.")
+                continue
             # Apply sentiment analysis
-            df[['sentiment_label', 'sentiment_score']] = df[text_column].apply(lambda x: pd.Series(analyze_sentiment(x)))
-            
-            # Update the Google Sheet with the new sentiment columns
-            update_sheet_data(df, MAIN_SPREADSHEET_NAME, worksheet_name)
+            label_col, score_col = sentiment_column_names(text_column)
+            df[label_col], df[score_col] = analyze_sentiment_column(df[text_column])
+            output_columns += [label_col, score_col]
+
+        if output_columns:
+            # Write back only the sentiment columns; the rest of the sheet is unchanged
+            update_sheet_columns(df, MAIN_SPREADSHEET_NAME, worksheet_name, output_columns)
             print(f"Successfully analyzed sentiment and updated worksheet: '{worksheet_name}'")
-        else:
-            print(f"ERROR: Text column '{text_column}' not found in worksheet '{worksheet_name}'. Skipping sentiment analysis.")
     else:
         print(f"Could not load data or worksheet '{worksheet_name}' is empty. Skipping sentiment analysis.")
 
 if __name__ == "__main__":
     print("Starting sentiment analysis process...")
 
-    # Define the worksheets and their respective text columns for sentiment analysis
+    # Define the worksheets and the text columns to analyze in each; every worksheet is read and written once
     # IMPORTANT: Use the EXACT worksheet names from your Google Sheet tabs (case and spaces matter!)
     worksheets_to_analyze = {
-        "Twitter_marketing_tweets": 'Tweet',  # For tweets
-        "YouTube_Product_Content": 'title', # For video titles (primary text for sentiment)
-        "YouTube_Product_Content": 'description', # Could also analyze descriptions
-        "YouTube_Product_Content": 'channel_title',
+        "Twitter_marketing_tweets": ['Tweet'],  # For tweets
+        # Video titles are the primary text for sentiment; descriptions and channel titles are analyzed too.
         # You might also have a 'comments' column in YouTube data if you extracted that
-        "Reddit_Product_Content": 'title',   # For Reddit post titles
-        "Reddit_Product_Content": 'selftext', # Could also analyze selftext
+        "YouTube_Product_Content": ['title', 'description', 'channel_title'],
+        "Reddit_Product_Content": ['title', 'selftext'], # Reddit post titles and self-text
     }
 
-    for ws_name, col_name in worksheets_to_analyze.items():
-        process_sentiment_for_worksheet(ws_name, col_name)
+    for ws_name, col_names in worksheets_to_analyze.items():
+        process_sentiment_for_worksheet(ws_name, col_names)
+
+    cache_info = _vader_compound.cache_info()
+    lookups = cache_info.hits + cache_info.misses
+    if lookups:
+        print(f"\nVADER score cache: {cache_info.hits}/{lookups} hits ({cache_info.hits / lookups:.0%}).")
 
-    print("\nSentiment analysis process completed.")
\ No newline at end of file
+    print("\nSentiment analysis process completed.")
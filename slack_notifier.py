@@ -1,8 +1,28 @@
 # slack_notifier.py
-import requests
+import asyncio
+import atexit
+import importlib.util
 import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 
+# orjson is optional; it serializes straight to bytes and is used for payloads when installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# httpx is optional; without it send_slack_notifications posts the batch one at a time over _session.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# HTTP/2 (one multiplexed connection for a whole batch) needs the h2 package alongside httpx.
+SLACK_HTTP2 = importlib.util.find_spec("h2") is not None
+
 # Load Slack Webhook URL from credentials.py
 try:
     from credentials import SLACK_WEBHOOK_URL
@@ -10,6 +30,40 @@ except ImportError:
     SLACK_WEBHOOK_URL = None
     print("Warning: SLACK_WEBHOOK_URL not found in credentials.py. Slack notifications will be disabled.")
 
+# One keep-alive session for every notification, so the TLS handshake with hooks.slack.com happens once.
+# Rate limiting (429, honouring Retry-After) and transient 5xx responses are retried with backoff.
+SLACK_TIMEOUT_SECONDS = 5
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=frozenset({"POST"}), raise_on_status=False),
+))
+atexit.register(_session.close)
+
+SLACK_MAX_CONCURRENT_POSTS = 4 # Posts in flight at once for a batch
+SLACK_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+SLACK_MAX_RETRIES = 3
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _build_payload(message, channel, username, icon_emoji):
+    """Builds the Incoming Webhook JSON body for one message."""
+    payload = {
+        "text": message,
+        "username": username,
+        "icon_emoji": icon_emoji,
+    }
+    if channel:
+        payload["channel"] = channel # Override the default channel if specified
+    return payload
+
+def _json_body(payload):
+    """Serializes a payload to JSON bytes, with orjson when it's installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
 def send_slack_notification(message, channel=None, username="AI Content Optimizer Bot", icon_emoji=":robot_face:"):
     """
     Sends a message to a Slack channel using an Incoming Webhook.
@@ -25,18 +79,10 @@ def send_slack_notification(message, channel=None, username="AI Content Optimize
         print(f"Slack notification skipped: {message} (Webhook URL not configured)")
         return False
 
-    headers = {'Content-type': 'application/json'}
-    
-    payload = {
-        "text": message,
-        "username": username,
-        "icon_emoji": icon_emoji,
-    }
-    if channel:
-        payload["channel"] = channel # Override the default channel if specified
+    payload = _build_payload(message, channel, username, icon_emoji)
 
     try:
-        response = requests.post(SLACK_WEBHOOK_URL, data=json.dumps(payload), headers=headers)
+        response = _session.post(SLACK_WEBHOOK_URL, data=_json_body(payload), headers=_JSON_HEADERS, timeout=SLACK_TIMEOUT_SECONDS)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         print(f"Slack notification sent successfully: {message}")
         return True
@@ -54,6 +100,83 @@ def send_slack_notification(message, channel=None, username="AI Content Optimize
         print(f"An unexpected error occurred while sending Slack notification: {err}")
         return False
 
+async def _post_async(client, semaphore, payload):
+    """Posts one payload, retrying rate-limited and 5xx responses like _session does."""
+    body = _json_body(payload)
+    async with semaphore:
+        for attempt in range(SLACK_MAX_RETRIES + 1):
+            try:
+                response = await client.post(SLACK_WEBHOOK_URL, content=body, headers=_JSON_HEADERS)
+            except httpx.HTTPError as err:
+                print(f"An error occurred while sending Slack notification: {err}")
+                return False
+            if response.status_code not in SLACK_RETRY_STATUSES or attempt == SLACK_MAX_RETRIES:
+                break
+            retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(float(retry_after) if retry_after and retry_after.isdigit() else 0.3 * 2 ** attempt)
+
+    if response.is_success:
+        print(f"Slack notification sent successfully: {payload['text']}")
+        return True
+    print(f"HTTP error occurred while sending Slack notification: {response.status_code}")
+    print(f"Response text: {response.text}")
+    return False
+
+async def _post_in_order(client, semaphore, payloads):
+    """Posts payloads one after another, so they arrive in the order given."""
+    return [await _post_async(client, semaphore, payload) for payload in payloads]
+
+async def send_slack_notifications_async(messages_by_channel, username="AI Content Optimizer Bot", icon_emoji=":robot_face:"):
+    """
+    Sends batches of messages over one httpx.AsyncClient (HTTP/2 when h2 is installed). Each
+    channel's messages are posted in order; different channels are posted to concurrently.
+    Use this from code that's already running an event loop; otherwise call send_slack_notifications.
+
+    Args:
+        messages_by_channel (dict): Maps each channel (None for the webhook's default channel) to
+                                    the list of text messages to send to it, in order.
+        username (str, optional): The name that will appear as the sender.
+        icon_emoji (str, optional): An emoji to use as the bot's icon.
+
+    Returns:
+        dict: Maps each channel to one bool per message, True if it was delivered.
+    """
+    if not SLACK_WEBHOOK_URL:
+        for messages in messages_by_channel.values():
+            for message in messages:
+                print(f"Slack notification skipped: {message} (Webhook URL not configured)")
+        return {channel: [False] * len(messages) for channel, messages in messages_by_channel.items()}
+
+    semaphore = asyncio.Semaphore(SLACK_MAX_CONCURRENT_POSTS)
+    async with httpx.AsyncClient(http2=SLACK_HTTP2, timeout=SLACK_TIMEOUT_SECONDS) as client:
+        results = await asyncio.gather(*(
+            _post_in_order(client, semaphore, [_build_payload(message, channel, username, icon_emoji) for message in messages])
+            for channel, messages in messages_by_channel.items()
+        ))
+    return dict(zip(messages_by_channel, results))
+
+def send_slack_notifications(messages_by_channel, username="AI Content Optimizer Bot", icon_emoji=":robot_face:"):
+    """
+    Sends batches of messages to Slack: each channel's messages in order, different channels
+    concurrently when httpx is installed. Without httpx every message is sent one at a time
+    with send_slack_notification.
+
+    Args:
+        messages_by_channel (dict): Maps each channel (None for the webhook's default channel) to
+                                    the list of text messages to send to it, in order.
+        username (str, optional): The name that will appear as the sender.
+        icon_emoji (str, optional): An emoji to use as the bot's icon.
+
+    Returns:
+        dict: Maps each channel to one bool per message, True if it was delivered.
+    """
+    if httpx is None:
+        return {
+            channel: [send_slack_notification(message, channel, username, icon_emoji) for message in messages]
+            for channel, messages in messages_by_channel.items()
+        }
+    return asyncio.run(send_slack_notifications_async(messages_by_channel, username, icon_emoji))
+
 if __name__ == "__main__":
     # Example Usage:
     print("Attempting to send a test Slack notification...")
@@ -1,15 +1,35 @@
 import pandas as pd
-from prophet import Prophet
+import matplotlib
+matplotlib.use("Agg") # Plots are only ever saved to files, so skip the GUI backend and its event loop
 import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+import argparse
+import importlib.util
+import json
 import os
 import logging
+import re
+
+try:
+    from statsforecast import StatsForecast
+    from statsforecast.models import AutoARIMA
+except ImportError:
+    StatsForecast = None
 
 # Suppress Prophet's verbose logging if you don't want to see all the Stan output
 logging.getLogger('prophet').setLevel(logging.WARNING)
 
 # --- Configuration ---
-GOOGLE_TRENDS_INTEREST_PATH = "google_trends_interest_over_time.csv"
+GOOGLE_TRENDS_INTEREST_PATH = "google_trends_interest_over_time.parquet" # Written by google_trends_extract.py
 FORECAST_PERIOD_DAYS = 30 # Forecast 30 days into the future
+PLOTS_DIR = "plots" # Forecast plots are saved here when run with --plot
+# Fitted parameters are kept per keyword and used to warm-start the next run's fit
+PROPHET_CACHE_DIR = "prophet_cache"
+# "statsforecast" fits AutoARIMA on every keyword in one batched call (milliseconds per series);
+# "prophet" fits one Prophet model per keyword. Falls back to Prophet if statsforecast isn't installed.
+FORECAST_BACKEND = "statsforecast"
+FORECAST_SEASON_LENGTH = 7 # Weekly seasonality in daily Trends data
+FORECAST_INTERVAL_LEVEL = 95 # Matches the yhat_lower/yhat_upper band reported for Prophet forecasts
 
 def load_google_trends_data(file_path):
     """
@@ -21,7 +41,12 @@ def load_google_trends_data(file_path):
         return pd.DataFrame()
     
     try:
-        df = pd.read_csv(file_path)
+        # Parquet is the normal format; the CSV branch still reads the optional debug copy.
+        # Both go through pyarrow's multithreaded readers.
+        if file_path.endswith('.parquet'):
+            df = pd.read_parquet(file_path, engine='pyarrow')
+        else:
+            df = pd.read_csv(file_path, compression='infer', engine='pyarrow')
         # Ensure 'date' column exists and is in datetime format
         if 'date' not in df.columns:
             print(f"Error: 'date' column not found in {file_path}")
@@ -35,7 +60,56 @@ def load_google_trends_data(file_path):
         print(f"Error loading or processing {file_path}: {e}")
         return pd.DataFrame()
 
-def forecast_keyword_interest(keyword, df_trends, forecast_days=FORECAST_PERIOD_DAYS, plot_results=True):
+def _safe_name(keyword):
+    """Returns a filesystem-safe version of a keyword for use in file names."""
+    return re.sub(r'[^\w-]+', '_', keyword)
+
+def _warm_start_path(keyword):
+    """Returns the warm-start parameter file for a keyword."""
+    return os.path.join(PROPHET_CACHE_DIR, f"{_safe_name(keyword)}.json")
+
+def _save_figure(fig, file_name):
+    """Saves a figure into PLOTS_DIR and closes it so figures don't pile up across keywords."""
+    os.makedirs(PLOTS_DIR, exist_ok=True)
+    path = os.path.join(PLOTS_DIR, file_name)
+    fig.savefig(path, dpi=96, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+def _load_warm_start_params(keyword):
+    """Loads the parameters saved by the previous fit for this keyword, or None if there are none."""
+    try:
+        with open(_warm_start_path(keyword), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_warm_start_params(keyword, model):
+    """Saves a fitted model's parameters in the form Prophet.fit(init=...) expects."""
+    params = {name: float(model.params[name][0][0]) for name in ['k', 'm', 'sigma_obs']}
+    params.update({name: model.params[name][0].tolist() for name in ['delta', 'beta']})
+    try:
+        os.makedirs(PROPHET_CACHE_DIR, exist_ok=True)
+        with open(_warm_start_path(keyword), "w", encoding="utf-8") as f:
+            json.dump(params, f)
+    except OSError as e:
+        print(f"Warning: Could not save warm-start parameters for '{keyword}': {e}")
+
+def _new_prophet_model():
+    """Creates a Prophet model with this project's settings."""
+    # Imported here rather than at module level: Prophet (and Stan behind it) is slow to load and
+    # only needed by the fallback backend, so statsforecast runs never import it
+    from prophet import Prophet
+    model = Prophet(
+        seasonality_mode='additive', # Can be 'additive' or 'multiplicative'
+        changepoint_prior_scale=0.05, # Adjust to control trend flexibility
+        daily_seasonality=False # Google Trends data is usually daily/weekly, no need for daily if it's weekly/monthly
+    )
+    # Add custom seasonality if your data has it (e.g., weekly, if it's not daily data)
+    # model.add_seasonality(name='weekly', period=7, fourier_order=3) # Example
+    return model
+
+def forecast_keyword_interest(keyword, df_trends, forecast_days=FORECAST_PERIOD_DAYS, plot_results=False):
     """
     Forecasts future interest for a given keyword using Prophet.
 
@@ -43,7 +117,7 @@ def forecast_keyword_interest(keyword, df_trends, forecast_days=FORECAST_PERIOD_
         keyword (str): The keyword column name in the DataFrame to forecast.
         df_trends (pd.DataFrame): DataFrame containing 'date' and keyword interest data.
         forecast_days (int): Number of days into the future to forecast.
-        plot_results (bool): Whether to display a plot of the forecast.
+        plot_results (bool): Whether to save plots of the forecast and its components to PLOTS_DIR.
 
     Returns:
         pd.DataFrame: A DataFrame with the forecast, including 'ds', 'yhat', 'yhat_lower', 'yhat_upper'.
@@ -64,15 +138,21 @@ def forecast_keyword_interest(keyword, df_trends, forecast_days=FORECAST_PERIOD_
         return pd.DataFrame()
 
     print(f"Training Prophet model for '{keyword}'...")
-    model = Prophet(
-        seasonality_mode='additive', # Can be 'additive' or 'multiplicative'
-        changepoint_prior_scale=0.05, # Adjust to control trend flexibility
-        daily_seasonality=False # Google Trends data is usually daily/weekly, no need for daily if it's weekly/monthly
-    )
-    # Add custom seasonality if your data has it (e.g., weekly, if it's not daily data)
-    # model.add_seasonality(name='weekly', period=7, fourier_order=3) # Example
-    
-    model.fit(prophet_df)
+    model = _new_prophet_model()
+
+    # Start from last run's optimum when we have one; with mostly the same history Stan converges much faster
+    warm_start = _load_warm_start_params(keyword)
+    if warm_start is not None:
+        try:
+            model.fit(prophet_df, init=warm_start)
+        except Exception as e:
+            # e.g. the changepoint/seasonality shapes changed since the parameters were saved
+            print(f"Warm start failed for '{keyword}' ({e}); fitting from scratch.")
+            model = _new_prophet_model()
+            model.fit(prophet_df)
+    else:
+        model.fit(prophet_df)
+    _save_warm_start_params(keyword, model)
     
     # Create future dataframe for forecasting
     future = model.make_future_dataframe(periods=forecast_days)
@@ -87,19 +167,85 @@ def forecast_keyword_interest(keyword, df_trends, forecast_days=FORECAST_PERIOD_
         plt.title(f'Google Trends Interest Forecast for "{keyword}"')
         plt.xlabel('Date')
         plt.ylabel('Interest Score')
-        plt.show()
+        _save_figure(fig, f"{_safe_name(keyword)}_forecast.png")
         
         # Plot components (trend, seasonality)
         fig_comp = model.plot_components(forecast)
         plt.suptitle(f'Forecast Components for "{keyword}"', y=1.02) # Adjust title position
         plt.tight_layout(rect=[0, 0.03, 1, 0.95]) # Adjust layout to prevent title overlap
-        plt.show()
+        _save_figure(fig_comp, f"{_safe_name(keyword)}_components.png")
 
     return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
 
+def forecast_all_keywords_statsforecast(keywords, df_trends, forecast_days=FORECAST_PERIOD_DAYS):
+    """
+    Forecasts future interest for several keywords at once with statsforecast's AutoARIMA.
+
+    Args:
+        keywords (list): The keyword column names in the DataFrame to forecast.
+        df_trends (pd.DataFrame): DataFrame containing 'date' and keyword interest data.
+        forecast_days (int): Number of days into the future to forecast.
+
+    Returns:
+        dict: Maps each keyword to a DataFrame with 'ds', 'yhat', 'yhat_lower', 'yhat_upper'
+              (empty if the keyword had no usable data).
+    """
+    # Long form, one series per keyword: unique_id, ds, y
+    long_df = df_trends.melt(id_vars='date', value_vars=keywords, var_name='unique_id', value_name='y')
+    long_df = long_df.rename(columns={'date': 'ds'})
+    long_df['y'] = pd.to_numeric(long_df['y'], errors='coerce')
+    long_df = long_df.dropna(subset=['y'])
+
+    forecasts = {keyword: pd.DataFrame() for keyword in keywords}
+    if long_df.empty:
+        print("After preprocessing, no valid data to forecast.")
+        return forecasts
+
+    print(f"Fitting AutoARIMA for {long_df['unique_id'].nunique()} keywords...")
+    sf = StatsForecast(models=[AutoARIMA(season_length=FORECAST_SEASON_LENGTH)], freq='D', n_jobs=-1)
+    result = sf.forecast(df=long_df, h=forecast_days, level=[FORECAST_INTERVAL_LEVEL])
+    if 'unique_id' not in result.columns: # Older statsforecast versions return it as the index
+        result = result.reset_index()
+
+    result = result.rename(columns={
+        'AutoARIMA': 'yhat',
+        f'AutoARIMA-lo-{FORECAST_INTERVAL_LEVEL}': 'yhat_lower',
+        f'AutoARIMA-hi-{FORECAST_INTERVAL_LEVEL}': 'yhat_upper',
+    })
+    for keyword, keyword_forecast in result.groupby('unique_id', sort=False):
+        forecasts[keyword] = keyword_forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].reset_index(drop=True)
+    return forecasts
+
+def plot_forecast(keyword, df_trends, forecast):
+    """
+    Plots a keyword's history and forecast (as returned by forecast_keyword_interest)
+    and saves it to PLOTS_DIR.
+
+    Args:
+        keyword (str): The keyword column name in df_trends.
+        df_trends (pd.DataFrame): DataFrame containing 'date' and keyword interest data.
+        forecast (pd.DataFrame): Forecast with 'ds', 'yhat', 'yhat_lower', 'yhat_upper'.
+
+    Returns:
+        str: Path of the saved plot.
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(df_trends['date'], pd.to_numeric(df_trends[keyword], errors='coerce'), 'k.', label='Observed')
+    ax.plot(forecast['ds'], forecast['yhat'], color='#0072B2', label='Forecast')
+    ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0072B2', alpha=0.2)
+    ax.set_title(f'Google Trends Interest Forecast for "{keyword}"')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Interest Score')
+    ax.legend()
+    return _save_figure(fig, f"{_safe_name(keyword)}_forecast.png")
+
 # --- Main Execution ---
 if __name__ == "__main__":
-    print("--- Starting Trend Prediction with Prophet ---")
+    parser = argparse.ArgumentParser(description="Forecast Google Trends interest for each keyword.")
+    parser.add_argument("--plot", action="store_true", help=f"save a plot of each forecast to {PLOTS_DIR}/")
+    args = parser.parse_args()
+
+    print("--- Starting Trend Prediction ---")
 
     # Load your Google Trends data
     trends_df = load_google_trends_data(GOOGLE_TRENDS_INTEREST_PATH)
@@ -111,13 +257,32 @@ if __name__ == "__main__":
         if not keywords_to_forecast:
             print("No keyword columns found in Google Trends data to forecast.")
         else:
-            for keyword in keywords_to_forecast:
-                print(f"\n--- Forecasting for Keyword: '{keyword}' ---")
-                forecast_result = forecast_keyword_interest(keyword, trends_df, plot_results=True)
-                
+            backend = FORECAST_BACKEND
+            if backend == "statsforecast" and StatsForecast is None:
+                print("Warning: statsforecast is not installed; falling back to Prophet.")
+                backend = "prophet"
+            if backend == "prophet" and importlib.util.find_spec("prophet") is None:
+                print("Error: prophet is not installed either. Install statsforecast (or prophet) to forecast.")
+                exit(1)
+
+            print(f"\n--- Forecasting {len(keywords_to_forecast)} keywords with {backend} ---")
+            if backend == "statsforecast":
+                forecasts_by_keyword = forecast_all_keywords_statsforecast(keywords_to_forecast, trends_df)
+                forecasts = [forecasts_by_keyword[keyword] for keyword in keywords_to_forecast]
+            else:
+                # Each Prophet fit is single-threaded Stan, so fit the keywords in parallel worker processes.
+                # Workers don't plot; plots are drawn here from the returned forecasts.
+                forecasts = Parallel(n_jobs=min(len(keywords_to_forecast), os.cpu_count() or 1), backend="loky", batch_size=1)(
+                    delayed(forecast_keyword_interest)(keyword, trends_df, plot_results=False) for keyword in keywords_to_forecast
+                )
+
+            for keyword, forecast_result in zip(keywords_to_forecast, forecasts):
+                print(f"\n--- Forecast for Keyword: '{keyword}' ---")
                 if not forecast_result.empty:
                     print(f"Forecast for '{keyword}' (next {FORECAST_PERIOD_DAYS} days):")
                     print(forecast_result.tail()) # Show last few forecast dates
+                    if args.plot:
+                        print(f"Plot saved to {plot_forecast(keyword, trends_df, forecast_result)}")
                     
                     # You could save this forecast to a CSV or upload to Google Sheets
                     # For example:
@@ -128,6 +293,6 @@ if __name__ == "__main__":
                 else:
                     print(f"Failed to generate forecast for '{keyword}'.")
     else:
-        print("No Google Trends data loaded. Please ensure google_trends_interest_over_time.csv exists and is populated.")
+        print("No Google Trends data loaded. Please ensure google_trends_interest_over_time.parquet exists and is populated.")
     
     print("\n--- Trend Prediction Complete ---")
\ No newline at end of file
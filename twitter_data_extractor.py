@@ -1,8 +1,11 @@
 import tweepy
 import pandas as pd
-import time
-import random
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from functools import partial
+import operator
 import os
+import threading
 from datetime import datetime, timedelta
 
 # --- 1. Load API Credentials from a separate file (e.g., credentials.py) ---
@@ -12,8 +15,22 @@ except ImportError:
     print("Error: credentials.py not found or incomplete. Please create it with your Twitter API keys.")
     exit()
 
-# --- 2. Initialize Tweepy Client ---
-client = tweepy.Client(BEARER_TOKEN, CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
+# --- 2. Initialize Tweepy Clients ---
+# Search terms are fetched concurrently on TWITTER_WORKERS threads. A Client wraps a requests
+# Session, so each thread gets its own. On a 429 a client sleeps until the x-rate-limit-reset
+# time from the response headers and retries, so requests only pause when the API actually
+# reports the window as exhausted.
+TWITTER_WORKERS = 4
+_tls = threading.local()
+
+def _client():
+    """Returns this thread's Tweepy client, creating it on first use."""
+    client = getattr(_tls, "client", None)
+    if client is None:
+        client = _tls.client = tweepy.Client(
+            BEARER_TOKEN, CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, wait_on_rate_limit=True
+        )
+    return client
 
 # --- 3. Define ALL Search Parameters ---
 # Keywords/hashtags to search for a wide range of product launches/trends
@@ -46,12 +63,106 @@ PRODUCT_SEARCH_TERMS = [
 MAX_TWEETS_PER_TERM = 100 # Adjust based on your API access level and data needs (max 100 per request)
 RECENT_TWEETS_DAYS = 7 # Look for tweets in the last N days (max 7 days for search_recent_tweets)
 
-def get_product_marketing_tweets(search_terms, max_results=MAX_TWEETS_PER_TERM, days_ago=RECENT_TWEETS_DAYS):
+OUTPUT_CSV_PATH = "product_marketing_tweets.csv"
+# Column order of the output CSV; matches the keys of each tweet row
+TWEET_FIELDS = [
+    "platform", "tweet_id", "created_at", "text", "search_term_matched",
+    "likes", "retweets", "replies", "quotes", "impressions",
+    "author_id", "author_username", "author_name", "author_followers",
+    "hashtags", "mentions", "urls",
+]
+
+# public_metrics keys read for every tweet, fetched together with one itemgetter call
+PUBLIC_METRIC_KEYS = ('like_count', 'retweet_count', 'reply_count', 'quote_count', 'impression_count')
+_PUBLIC_METRIC_DEFAULTS = dict.fromkeys(PUBLIC_METRIC_KEYS, 0)
+_get_public_metrics = operator.itemgetter(*PUBLIC_METRIC_KEYS)
+
+def _tweet_row(tweet, author, term):
+    """Builds the output row for one tweet."""
+    likes, retweets, replies, quotes, impressions = _get_public_metrics(
+        {**_PUBLIC_METRIC_DEFAULTS, **(tweet.public_metrics or {})}
+    )
+    entities = tweet.entities
+    if entities:
+        hashtags = [tag['tag'] for tag in entities.get('hashtags', ())]
+        mentions = [mention['username'] for mention in entities.get('mentions', ())]
+        urls = [url['expanded_url'] for url in entities.get('urls', ())]
+    else:
+        hashtags, mentions, urls = [], [], []
+
+    return {
+        "platform": "Twitter",
+        "tweet_id": tweet.id,
+        "created_at": tweet.created_at,
+        "text": tweet.text,
+        "search_term_matched": term, # Which term caught this tweet
+        "likes": likes,
+        "retweets": retweets,
+        "replies": replies,
+        "quotes": quotes,
+        "impressions": impressions,
+        "author_id": tweet.author_id,
+        "author_username": author.username if author else None,
+        "author_name": author.name if author else None,
+        "author_followers": author.public_metrics.get('followers_count', 0) if author and author.public_metrics else 0,
+        "hashtags": hashtags,
+        "mentions": mentions,
+        "urls": urls,
+    }
+
+def _search_term(term, start_time, page_size, page_limit):
+    """Fetches and builds the rows for every tweet matching one search term. Runs on a worker thread."""
+    print(f"\nSearching for term: '{term}'")
+    rows = []
+    try:
+        # Construct the query.
+        # -is:retweet excludes retweets, -is:reply excludes replies
+        # lang:en filters for English tweets
+        # The '\"...\"' syntax ensures exact phrase matching for multi-word terms.
+        query = f'{term} -is:retweet -is:reply lang:en' # No need for external quotes here, Tweepy handles it.
+
+        # Use client.search_recent_tweets for up to 7 days of historical data, following next_token
+        # until max_results tweets have been read for this term
+        pages = tweepy.Paginator(
+            _client().search_recent_tweets,
+            query=query,
+            tweet_fields=['created_at', 'text', 'public_metrics', 'entities', 'author_id'],
+            user_fields=['username', 'name', 'public_metrics'], # To get follower count etc.
+            expansions=['author_id'],
+            start_time=start_time,
+            max_results=page_size,
+            limit=page_limit
+        )
+        for response in pages:
+            if not response.data:
+                continue
+            users = {user['id']: user for user in response.includes.get('users', [])}
+            rows.extend(_tweet_row(tweet, users.get(tweet.author_id), term) for tweet in response.data)
+
+    except tweepy.errors.TweepyException as e:
+        # Rate limits never get here: the client waits out a 429 until the reset time itself
+        print(f"  Tweepy API error for term '{term}': {e}")
+        print("  Skipping to next term due to other API error.")
+    except Exception as e:
+        print(f"  An unexpected error occurred for term '{term}': {e}")
+    return rows # Tweets read before an error are kept
+
+def get_product_marketing_tweets(search_terms, output_csv_path=OUTPUT_CSV_PATH, max_results=MAX_TWEETS_PER_TERM, days_ago=RECENT_TWEETS_DAYS):
     """
     Fetches product-centric tweets from Twitter/X using specified search terms.
-    Extracts content, engagement, and basic user info.
+    Extracts content, engagement, and basic user info. Terms are searched concurrently on
+    TWITTER_WORKERS threads, and each unique tweet is written to the output CSV as its
+    term's results are merged rather than collected in memory.
+
+    Args:
+        search_terms (list): Search terms/hashtags to query.
+        output_csv_path (str): CSV file the tweets are written to (overwritten).
+        max_results (int): Max tweets fetched per search term.
+        days_ago (int): How many days back to search.
+
+    Returns:
+        int: Number of unique tweets written.
     """
-    all_tweet_data = []
     
     # Calculate start time for recent tweets
     start_time = datetime.utcnow() - timedelta(days=days_ago)
@@ -61,96 +172,50 @@ def get_product_marketing_tweets(search_terms, max_results=MAX_TWEETS_PER_TERM,
     # We'll use a set to store unique tweet IDs to avoid duplicates if multiple terms match the same tweet
     seen_tweet_ids = set()
 
-    for term in search_terms:
-        # Twitter API v2's `search_recent_tweets` has a limit of 100 results per request.
-        # If you need more than 100 per term, you'd need to implement pagination using `next_token`
-        # For this initial phase, 100 per term is a good starting point.
-        print(f"\nSearching for term: '{term}'")
-        try:
-            # Construct the query.
-            # -is:retweet excludes retweets, -is:reply excludes replies
-            # lang:en filters for English tweets
-            # The '\"...\"' syntax ensures exact phrase matching for multi-word terms.
-            query = f'{term} -is:retweet -is:reply lang:en' # No need for external quotes here, Tweepy handles it.
-            
-            # Use client.search_recent_tweets for up to 7 days of historical data
-            response = client.search_recent_tweets(
-                query=query,
-                tweet_fields=['created_at', 'text', 'public_metrics', 'entities', 'author_id'],
-                user_fields=['username', 'name', 'public_metrics'], # To get follower count etc.
-                expansions=['author_id'],
-                start_time=start_time,
-                max_results=min(max_results, 100) # Max 100 per request for search_recent_tweets
-            )
-
-            if response.data:
-                users = {user['id']: user for user in response.includes.get('users', [])}
-                # Filter out tweets already seen from previous search terms
-                new_tweets_count = 0
-                for tweet in response.data:
-                    if tweet.id not in seen_tweet_ids:
-                        author = users.get(tweet.author_id)
-                        
-                        tweet_info = {
-                            "platform": "Twitter",
-                            "tweet_id": tweet.id,
-                            "created_at": tweet.created_at,
-                            "text": tweet.text,
-                            "search_term_matched": term, # Which term caught this tweet
-                            "likes": tweet.public_metrics.get('like_count', 0),
-                            "retweets": tweet.public_metrics.get('retweet_count', 0),
-                            "replies": tweet.public_metrics.get('reply_count', 0),
-                            "quotes": tweet.public_metrics.get('quote_count', 0),
-                            "impressions": tweet.public_metrics.get('impression_count', 0),
-                            "author_id": tweet.author_id,
-                            "author_username": author.username if author else None,
-                            "author_name": author.name if author else None,
-                            "author_followers": author.public_metrics.get('followers_count', 0) if author and author.public_metrics else 0,
-                            "hashtags": [tag['tag'] for tag in tweet.entities.get('hashtags', [])] if tweet.entities else [],
-                            "mentions": [mention['username'] for mention in tweet.entities.get('mentions', [])] if tweet.entities else [],
-                            "urls": [url['expanded_url'] for url in tweet.entities.get('urls', [])] if tweet.entities else [],
-                        }
-                        all_tweet_data.append(tweet_info)
-                        seen_tweet_ids.add(tweet.id)
-                        new_tweets_count += 1
-                print(f"  Added {new_tweets_count} new unique tweets (total found for term: {len(response.data)}) for '{term}'")
-            else:
-                print(f"  No tweets found for '{term}' in the last {days_ago} days.")
+    # search_recent_tweets returns 10-100 tweets per request; read enough pages to cover max_results
+    page_size = max(10, min(max_results, 100))
+    page_limit = -(-max_results // page_size)
+    search = partial(_search_term, start_time=start_time, page_size=page_size, page_limit=page_limit)
 
-            # Be polite to the API and avoid rate limits. A longer sleep helps with many terms.
-            time.sleep(random.randint(10, 25)) # Increased sleep time
+    with open(output_csv_path, "w", newline="", encoding="utf-8") as f, \
+            ThreadPoolExecutor(max_workers=TWITTER_WORKERS) as executor:
+        writer = csv.DictWriter(f, fieldnames=TWEET_FIELDS)
+        writer.writeheader()
 
-        except tweepy.errors.TweepyException as e:
-            print(f"  Tweepy API error for term '{term}': {e}")
-            if "Rate limit exceeded" in str(e) or "429 Too Many Requests" in str(e):
-                print("  Rate limit hit. Sleeping for 15 minutes before retrying or exiting.")
-                time.sleep(900) # Sleep for 15 minutes (900 seconds)
-            else:
-                print("  Skipping to next term due to other API error.")
-        except Exception as e:
-            print(f"  An unexpected error occurred for term '{term}': {e}")
-
-    return pd.DataFrame(all_tweet_data)
+        # Merge in search-term order so the first term to find a tweet keeps it, as before
+        for term, rows in zip(search_terms, executor.map(search, search_terms)):
+            if not rows:
+                print(f"  No tweets found for '{term}' in the last {days_ago} days.")
+                continue
+            # Filter out tweets already seen from previous search terms
+            new_tweets_count = 0
+            for row in rows:
+                if row["tweet_id"] not in seen_tweet_ids:
+                    writer.writerow(row)
+                    seen_tweet_ids.add(row["tweet_id"])
+                    new_tweets_count += 1
+            print(f"  Added {new_tweets_count} new unique tweets (total found for term: {len(rows)}) for '{term}'")
+
+    return len(seen_tweet_ids)
 
 # --- Main Execution ---
 if __name__ == "__main__":
     print("--- Starting Product Marketing Tweet Extraction ---")
-    product_tweets_df = get_product_marketing_tweets(PRODUCT_SEARCH_TERMS, max_results=100)
+    tweet_count = get_product_marketing_tweets(PRODUCT_SEARCH_TERMS, max_results=100)
 
-    if not product_tweets_df.empty:
-        output_csv_path = "product_marketing_tweets.csv"
-        product_tweets_df.to_csv(output_csv_path, index=False)
-        print(f"\nSuccessfully extracted {len(product_tweets_df)} unique product-related tweets.")
-        print(f"Data saved to {output_csv_path}")
+    if tweet_count:
+        print(f"\nSuccessfully extracted {tweet_count} unique product-related tweets.")
+        print(f"Data saved to {OUTPUT_CSV_PATH}")
         print("\nFirst 5 rows of extracted data:")
-        print(product_tweets_df.head())
+        print(pd.read_csv(OUTPUT_CSV_PATH, nrows=5))
 
         # --- Integrate with Google Sheets ---
         try:
             from upload_to_sheets import upload_to_google_sheet
             print("\nAttempting to upload data to Google Sheets...")
             # Use a distinct sheet/worksheet name for product tweets
-            upload_to_google_sheet(product_tweets_df, "AI_Content_Optimizer_Data", "Twitter_Product_Content")
+            # The worksheet is replaced in one request, so the saved CSV is read back whole for the upload
+            upload_to_google_sheet(pd.read_csv(OUTPUT_CSV_PATH), "AI_Content_Optimizer_Data", "Twitter_Product_Content")
         except ImportError:
             print("\nWarning: upload_to_sheets.py not found. Skipping Google Sheets upload.")
         except Exception as e:
@@ -166,7 +231,7 @@ if __name__ == "__main__":
     if send_slack_notification:
         slack_message = (
             f":sparkles: New Twitter product marketing tweets found! :twitter:\n"
-            f"Extracted {len(product_tweets_df)} unique product-related Twitter tweets.\n"
+            f"Extracted {tweet_count} unique product-related Twitter tweets.\n"
             f"Check the Google Sheet here: https://docs.google.com/spreadsheets/d/1aAdsgz9AagAOxkRSoxdaIaJ6N76U8G1xb4mPC-_h5HE/edit?usp=sharing\n" # IMPORTANT: Replace with actual link
             f"Worksheet: AI_Content_Optimizer_Data\n"
             f"Check: Twitter_Product_Content worksheet for the details."
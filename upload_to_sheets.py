@@ -1,14 +1,28 @@
 # upload_to_sheets.py (DEBUGGING VERSION)
 import gspread
-from gspread_dataframe import set_with_dataframe
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+import numbers
 import os
 
+def _to_cell_data(value):
+    """Converts a single DataFrame value into a Sheets API CellData dict."""
+    if value is None:
+        return {}
+    if isinstance(value, (bool, np.bool_)):
+        return {"userEnteredValue": {"boolValue": bool(value)}}
+    if isinstance(value, numbers.Number):
+        return {"userEnteredValue": {"numberValue": float(value)}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
 def upload_to_google_sheet(dataframe, sheet_name, worksheet_name):
     """
     Uploads a pandas DataFrame to a specified Google Sheet worksheet.
     Assumes you have set up gspread authentication using a service account JSON file.
+
+    Returns:
+        bool: True if the worksheet was written, False if the upload failed (the error is printed).
     """
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -24,7 +38,7 @@ def upload_to_google_sheet(dataframe, sheet_name, worksheet_name):
             print(f"DEBUG: Spreadsheet '{sheet_name}' opened successfully.")
         except gspread.exceptions.SpreadsheetNotFound:
             print(f"ERROR: Spreadsheet '{sheet_name}' not found. Please create this sheet manually in Google Drive and share it with your service account.")
-            return # Exit function if primary spreadsheet not found
+            return False # Exit function if primary spreadsheet not found
         
         # Get or create the worksheet
         print(f"DEBUG: Attempting to find or create worksheet: '{worksheet_name}'")
@@ -36,13 +50,26 @@ def upload_to_google_sheet(dataframe, sheet_name, worksheet_name):
             worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows="1000", cols="50")
             print(f"DEBUG: Created new worksheet: '{worksheet_name}' successfully.")
 
-        print(f"DEBUG: Clearing existing data in worksheet '{worksheet_name}'...")
-        worksheet.clear()
-        print(f"DEBUG: Data cleared.")
-
+        # Overwrite the whole worksheet in a single batchUpdate: an updateCells request over the
+        # entire sheet writes the DataFrame and clears every cell it doesn't cover, replacing
+        # the separate clear() and write round-trips.
         print(f"DEBUG: Uploading DataFrame to worksheet '{worksheet_name}'...")
-        set_with_dataframe(worksheet, dataframe)
+        rows = [dataframe.columns.tolist()] + dataframe.astype(object).where(dataframe.notna(), None).values.tolist()
+        requests = []
+        if len(rows) > worksheet.row_count:
+            requests.append({"appendDimension": {"sheetId": worksheet.id, "dimension": "ROWS", "length": len(rows) - worksheet.row_count}})
+        if len(rows[0]) > worksheet.col_count:
+            requests.append({"appendDimension": {"sheetId": worksheet.id, "dimension": "COLUMNS", "length": len(rows[0]) - worksheet.col_count}})
+        requests.append({
+            "updateCells": {
+                "range": {"sheetId": worksheet.id},
+                "rows": [{"values": [_to_cell_data(value) for value in row]} for row in rows],
+                "fields": "userEnteredValue",
+            }
+        })
+        spreadsheet.batch_update({"requests": requests})
         print(f"DEBUG: Successfully uploaded data to Google Sheet '{sheet_name}', worksheet '{worksheet_name}'")
+        return True
 
     except gspread.exceptions.APIError as e:
         print(f"\nCRITICAL GOOGLE SHEETS API ERROR: {e}")
@@ -57,6 +84,7 @@ def upload_to_google_sheet(dataframe, sheet_name, worksheet_name):
     except Exception as e:
         print(f"\nUNEXPECTED ERROR during Google Sheets upload: {type(e).__name__}: {e}")
         print("This error is general. Please review previous DEBUG messages for clues.")
+    return False
     
 # Example of how you might test this function independently (optional)
 if __name__ == '__main__':
@@ -1,9 +1,28 @@
 import os
+import base64
+import binascii
 import googleapiclient.discovery
+import googleapiclient.errors
+import googleapiclient.model
+import httplib2
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+import threading
 import time
-import random
+
+from rate_limiter import TokenBucket
+
+# orjson is optional; when installed it decodes the API responses in place of the stdlib json module.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- 1. Load API Credentials from credentials.py ---
 try:
@@ -17,10 +36,76 @@ except ImportError:
 API_SERVICE_NAME = "youtube"
 API_VERSION = "v3"
 
-# Build the client
-youtube = googleapiclient.discovery.build(
-    API_SERVICE_NAME, API_VERSION, developerKey=YOUTUBE_API_KEY
-)
+# Search terms are fetched concurrently on YOUTUBE_WORKERS threads. The client's httplib2 transport
+# isn't thread-safe, so each worker thread lazily builds and keeps its own client; its Http object
+# keeps the connection to the API open, so each thread pays for one TLS handshake rather than one per
+# request. All of them share one token bucket that paces requests (the per-term sleeps this replaces
+# averaged one every ~10s).
+YOUTUBE_WORKERS = 6
+YOUTUBE_DETAIL_WORKERS = 4 # Threads running videos.list batches alongside the searches
+YOUTUBE_RATE_LIMITER = TokenBucket(rate=1.0, capacity=YOUTUBE_WORKERS)
+# execute() retries 429s, 5xx and 403 rate-limit errors with exponential backoff (not daily-quota 403s)
+YOUTUBE_MAX_RETRIES = 5
+_tls = threading.local()
+
+# Responses are kept in an httplib2 disk cache shared by all runs. Cached entries are revalidated
+# with their ETag (If-None-Match), so a result that hasn't changed comes back as a 304 with no body.
+# Search URLs change every day (publishedAfter) and videos.list URLs with every batch of IDs, so
+# entries are only worth keeping for a day or two; older ones are pruned when the first client is built.
+YOUTUBE_HTTP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-content-optimizer", "youtube_http")
+YOUTUBE_HTTP_CACHE_MAX_AGE = timedelta(days=2)
+_http_cache_ready = False
+_http_cache_lock = threading.Lock()
+
+# Details of every video written are also kept across runs, so a video the searches find again is
+# taken from here instead of another videos.list request. Entries older than YOUTUBE_DETAILS_MAX_AGE
+# are fetched again so view/like counts keep moving; searches only look back DAYS_AGO days, so a
+# longer max age would mean a video's counts are never refreshed at all.
+YOUTUBE_DETAILS_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-content-optimizer", "youtube_video_details.parquet")
+YOUTUBE_DETAILS_MAX_AGE = timedelta(days=3)
+
+class _OrjsonModel(googleapiclient.model.JsonModel):
+    """JsonModel that parses response bodies with orjson, straight from the bytes httplib2 returns."""
+    def deserialize(self, content):
+        body = orjson.loads(content)
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+def _prepare_http_cache():
+    """Creates the HTTP cache directory and prunes entries older than YOUTUBE_HTTP_CACHE_MAX_AGE (once per process)."""
+    global _http_cache_ready
+    with _http_cache_lock:
+        if _http_cache_ready:
+            return
+        # Created here rather than by httplib2, which does it without exist_ok and can race between worker threads
+        os.makedirs(YOUTUBE_HTTP_CACHE_DIR, exist_ok=True)
+        cutoff = time.time() - YOUTUBE_HTTP_CACHE_MAX_AGE.total_seconds()
+        for entry in os.scandir(YOUTUBE_HTTP_CACHE_DIR):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass # Removed by a concurrent run, or not ours to remove
+        _http_cache_ready = True
+
+def _youtube():
+    """
+    Returns this thread's YouTube API client, creating it on first use. A client inherited
+    through fork() is rebuilt too, since its open connection would be shared with the parent.
+    """
+    if getattr(_tls, 'pid', None) != os.getpid():
+        _prepare_http_cache()
+        # Build the client
+        # The discovery document bundled with the library is used, so building makes no request
+        _tls.youtube = googleapiclient.discovery.build(
+            API_SERVICE_NAME, API_VERSION, developerKey=YOUTUBE_API_KEY,
+            static_discovery=True, cache_discovery=False,
+            http=httplib2.Http(cache=YOUTUBE_HTTP_CACHE_DIR),
+            model=_OrjsonModel() if orjson is not None else None # None keeps the default JsonModel
+        )
+        _tls.pid = os.getpid()
+    return _tls.youtube
 
 # --- 3. Define Search Parameters ---
 YOUTUBE_PRODUCT_SEARCH_TERMS = [
@@ -44,137 +129,383 @@ YOUTUBE_PRODUCT_SEARCH_TERMS = [
 
 MAX_RESULTS_PER_QUERY = 50 # Max 50 per page, can get up to 500 per query with pagination
 DAYS_AGO = 7 # Look for videos published in the last N days
+# Each search.list call costs 100 quota units. Setting this above 1 OR-combines that many terms into
+# one query (q='"a" | "b" | c'), cutting search calls and quota, at the cost of sharing one page of
+# max_results between the grouped terms and recording the combined query as search_term_matched.
+TERMS_PER_SEARCH_QUERY = 1
+
+# Output columns, in order. Rows are gathered column-wise (one list per column) and turned
+# into a DataFrame once at the end, instead of building a dict per video.
+VIDEO_COLUMNS = [
+    "platform", "video_id", "search_term_matched", "title", "description", "published_at",
+    "channel_title", "channel_id", "view_count", "like_count", "comment_count", "tags", "thumbnail_url",
+]
+# The API returns statistics as JSON strings; these are stored as int64 (0 when hidden or missing)
+COUNT_COLUMNS = ["view_count", "like_count", "comment_count"]
+# Low-cardinality strings repeated on many rows (platform is constant, search_term_matched is one of the
+# search terms); stored as categoricals in memory and dictionary-encoded in the Parquet file
+CATEGORY_COLUMNS = ["platform", "search_term_matched", "channel_title", "channel_id"]
 
-def get_product_marketing_videos(search_terms, max_results=MAX_RESULTS_PER_QUERY, days_ago=DAYS_AGO):
+VIDEOS_PER_DETAILS_REQUEST = 50 # Max video IDs per videos.list request
+# Partial response: only the snippet/statistics fields that end up in VIDEO_COLUMNS
+VIDEO_DETAIL_FIELDS = (
+    "items(id,"
+    "snippet(title,description,publishedAt,channelTitle,channelId,tags,thumbnails/high/url),"
+    "statistics(viewCount,likeCount,commentCount))"
+)
+
+# Output is snappy-compressed Parquet, written one row group per videos.list batch. The explicit
+# schema keeps every batch's types identical (e.g. tags stays list<string> even in a batch with no tags).
+OUTPUT_PARQUET_PATH = "youtube_product_marketing_videos.parquet"
+VIDEO_SCHEMA = pa.schema([
+    ("platform", pa.dictionary(pa.int32(), pa.string())),
+    ("video_id", pa.string()),
+    ("search_term_matched", pa.dictionary(pa.int32(), pa.string())),
+    ("title", pa.string()),
+    ("description", pa.string()),
+    ("published_at", pa.timestamp("ns", tz="UTC")),
+    ("channel_title", pa.dictionary(pa.int32(), pa.string())),
+    ("channel_id", pa.dictionary(pa.int32(), pa.string())),
+    ("view_count", pa.int64()),
+    ("like_count", pa.int64()),
+    ("comment_count", pa.int64()),
+    ("tags", pa.list_(pa.string())),
+    ("thumbnail_url", pa.string()),
+])
+
+def _video_key(video_id):
+    """
+    Returns a compact, exact dedup key for a video ID. YouTube IDs are 11 URL-safe base64
+    characters encoding a 64-bit value, so they decode losslessly to one int; anything
+    else is kept as the string.
+    """
+    if len(video_id) == 11:
+        try:
+            return int.from_bytes(base64.urlsafe_b64decode(video_id + "="), "big")
+        except (binascii.Error, ValueError):
+            pass
+    return video_id
+
+def _report_api_error(e, description):
+    """Prints a YouTube API error with a hint for the common status codes."""
+    if isinstance(e, googleapiclient.errors.HttpError):
+        print(f"  YouTube API HTTP Error for {description}: {e}")
+        if e.resp.status == 403: # Forbidden, often means API Key issues or quota exceeded
+            print("  Quota Exceeded or API Key issue. Check your Google Cloud Console for daily quota.")
+            # You might want to break here if it's a hard quota
+        elif e.resp.status == 400: # Bad Request
+            print("  Bad request. Check your search query parameters.")
+        print("  Skipping due to API error.")
+    else:
+        print(f"  An unexpected error occurred for {description}: {e}")
+
+def _search_one_term(term, published_after, max_results, days_ago):
+    """
+    Searches one term. Runs on a worker thread.
+
+    Returns:
+        list: IDs of the videos found, in relevance order.
+    """
+    print(f"\nSearching for term: '{term}'")
+    video_ids = []
+    try:
+        # Perform the search request
+        request = _youtube().search().list(
+            part="id", # Only the video IDs are used; details come from videos.list
+            fields="items(id/videoId)",
+            q=term,
+            type="video", # We only want videos
+            order="relevance", # Sort by relevance
+            publishedAfter=published_after, # Only recent videos
+            maxResults=max_results,
+            relevanceLanguage="en", # Filter for English videos
+        )
+        YOUTUBE_RATE_LIMITER.acquire()
+        response = request.execute(num_retries=YOUTUBE_MAX_RETRIES)
+
+        if response.get('items'):
+            print(f"  Found {len(response['items'])} potential videos for '{term}'")
+            video_ids = [item['id']['videoId'] for item in response['items']]
+        else:
+            print(f"  No videos found for '{term}' in the last {days_ago} days.")
+    except Exception as e:
+        _report_api_error(e, f"term '{term}'")
+    return video_ids
+
+def _thumbnail_url(snippet):
+    """Returns the 'high' thumbnail URL from a video snippet, or None if it has none."""
+    return (snippet.get('thumbnails') or {}).get('high', {}).get('url')
+
+def _fetch_video_details(video_terms, min_views=0):
+    """
+    Fetches snippet and statistics (views, likes, comments) for up to 50 videos in one
+    videos.list request. Runs on a worker thread.
+
+    Args:
+        video_terms (dict): Video IDs mapped to the search term that found them.
+        min_views (int): Videos with fewer views are dropped before their row is built.
+
+    Returns:
+        dict: VIDEO_COLUMNS mapped to lists holding one entry per video.
+    """
+    columns = {col: [] for col in VIDEO_COLUMNS}
+    filled = 0
+    try:
+        videos_request = _youtube().videos().list(
+            part="snippet,statistics",
+            fields=VIDEO_DETAIL_FIELDS,
+            id=",".join(video_terms)
+        )
+        YOUTUBE_RATE_LIMITER.acquire()
+        videos_response = videos_request.execute(num_retries=YOUTUBE_MAX_RETRIES)
+
+        # The response size is known, so each column list is allocated once at full size and filled in place
+        items = videos_response.get('items', [])
+        columns = {col: [None] * len(items) for col in VIDEO_COLUMNS}
+        column_lists = list(columns.values()) # Same order as VIDEO_COLUMNS
+        for video_item in items:
+            snippet = video_item['snippet']
+            stats = video_item.get('statistics', {}) # statistics might be missing for some videos
+            view_count = int(stats.get('viewCount') or 0)
+            if view_count < min_views:
+                continue
+            # In VIDEO_COLUMNS order. Every field is read before any is stored, so an item
+            # with a missing field can't leave the columns uneven
+            row = (
+                "YouTube",
+                video_item['id'],
+                video_terms.get(video_item['id']),
+                snippet['title'],
+                snippet['description'],
+                snippet['publishedAt'],
+                snippet['channelTitle'],
+                snippet['channelId'],
+                view_count,
+                int(stats.get('likeCount') or 0), # Likes might be disabled/hidden
+                int(stats.get('commentCount') or 0), # Comments might be disabled
+                snippet.get('tags', []), # Hashtags in description or video tags
+                # You can add more fields if needed, e.g., default_thumbnail.url
+                _thumbnail_url(snippet),
+            )
+            for column, value in zip(column_lists, row):
+                column[filled] = value
+            filled += 1
+    except Exception as e:
+        _report_api_error(e, f"details of {len(video_terms)} videos")
+    # Drop the unfilled slots: those of videos below min_views, and after an error everything past
+    # the last video read (videos read before it are kept)
+    for column in columns.values():
+        del column[filled:]
+    return columns
+
+def _load_details_cache(path):
+    """Returns the cached video details fetched within YOUTUBE_DETAILS_MAX_AGE, indexed by video_id."""
+    empty = pd.DataFrame(columns=VIDEO_COLUMNS + ["fetched_at"]).set_index("video_id")
+    if path is None or not os.path.exists(path):
+        return empty
+    try:
+        cache = pd.read_parquet(path)
+    except Exception as e:
+        print(f"Warning: Could not read the YouTube details cache {path}: {e}")
+        return empty
+    cutoff = pd.Timestamp.now(tz="UTC") - YOUTUBE_DETAILS_MAX_AGE
+    return cache[cache["fetched_at"] >= cutoff].set_index("video_id")
+
+def _cached_video_details(cache, video_terms, min_views=0):
+    """Returns VIDEO_COLUMNS lists for videos whose details are in the cache, like _fetch_video_details."""
+    rows = cache.loc[list(video_terms)]
+    rows = rows[rows["view_count"] >= min_views]
+    columns = {col: rows[col].tolist() for col in VIDEO_COLUMNS if col != "video_id"}
+    columns["video_id"] = rows.index.tolist()
+    columns["search_term_matched"] = [video_terms[video_id] for video_id in columns["video_id"]]
+    # Back to the API's string form, which _columns_to_frame parses
+    columns["published_at"] = rows["published_at"].dt.strftime("%Y-%m-%dT%H:%M:%SZ").tolist()
+    columns["tags"] = [list(tags) for tags in rows["tags"]] # Parquet reads lists back as arrays
+    return columns
+
+def _save_details_cache(path, output_path, cache):
+    """
+    Rewrites the details cache with every video in this run's output (rows that came from the
+    cache keep their original fetch time) plus the still-fresh cached videos not seen this run.
+    """
+    fetched = pd.read_parquet(output_path)
+    fetched["fetched_at"] = fetched["video_id"].map(cache["fetched_at"]).fillna(pd.Timestamp.now(tz="UTC"))
+    kept = cache[~cache.index.isin(fetched["video_id"])].reset_index()
+    if not kept.empty:
+        fetched = pd.concat([fetched, kept], ignore_index=True)
+    # Written to a temp file and swapped in, so an interrupted run can't leave a truncated cache
+    tmp_path = path + ".tmp"
+    fetched.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _combine_search_terms(search_terms, terms_per_query):
+    """Groups search terms into YouTube OR queries of up to terms_per_query terms each."""
+    if terms_per_query <= 1:
+        return list(search_terms)
+    return [" | ".join(search_terms[i:i + terms_per_query]) for i in range(0, len(search_terms), terms_per_query)]
+
+def _columns_to_frame(columns):
+    """
+    Builds a DataFrame from VIDEO_COLUMNS lists, with the count columns as int64, published_at
+    as UTC datetimes and CATEGORY_COLUMNS as categoricals.
+    """
+    columns = dict(columns)
+    for col in COUNT_COLUMNS:
+        columns[col] = np.fromiter(columns[col], dtype=np.int64, count=len(columns[col]))
+    # RFC 3339 strings like '2024-05-01T12:34:56Z', parsed in one vectorized pass
+    columns["published_at"] = pd.to_datetime(columns["published_at"], utc=True, format="ISO8601")
+    for col in CATEGORY_COLUMNS:
+        columns[col] = pd.Categorical(columns[col])
+    return pd.DataFrame(columns, columns=VIDEO_COLUMNS)
+
+def _append_batch(writer, columns):
+    """Writes a batch of VIDEO_COLUMNS lists as one row group of the open Parquet file and returns its row count."""
+    if not columns["video_id"]:
+        return 0
+    writer.write_table(pa.Table.from_pandas(_columns_to_frame(columns), schema=VIDEO_SCHEMA, preserve_index=False))
+    return len(columns["video_id"])
+
+def get_product_marketing_videos(search_terms, output_path=OUTPUT_PARQUET_PATH, max_results=MAX_RESULTS_PER_QUERY, days_ago=DAYS_AGO, terms_per_query=TERMS_PER_SEARCH_QUERY, since=None, min_views=0, details_cache_path=YOUTUBE_DETAILS_CACHE_PATH):
     """
     Searches YouTube for product-centric videos and extracts relevant data.
+    Terms are searched concurrently on YOUTUBE_WORKERS threads, optionally OR-combined
+    into groups of terms_per_query per search request. Unique videos are looked up in
+    batches of 50 and each batch is appended to the output Parquet file as soon as it arrives,
+    so only a few batches of rows are held in memory.
+
+    Args:
+        search_terms (list): Search terms to query.
+        output_path (str): Parquet file the videos are written to (overwritten).
+        max_results (int): Max search results per query.
+        days_ago (int): Only videos published in the last N days are returned.
+        terms_per_query (int): Terms OR-combined into each search request.
+        since (datetime, optional): Only videos published after this are returned. It's sent to the
+            search as publishedAfter (when later than the days_ago cutoff), so older videos never
+            reach a videos.list request.
+        min_views (int): Videos with fewer views are left out of the output. Views are only known
+            once a video's statistics are fetched, so this saves the row work but not the quota.
+        details_cache_path (str, optional): Parquet file video details are reused from and saved to
+            across runs (see YOUTUBE_DETAILS_MAX_AGE). None disables it.
+
+    Returns:
+        int: Number of unique videos written.
     """
-    all_video_data = []
+    search_terms = _combine_search_terms(search_terms, terms_per_query)
+    video_count = 0
     
-    # Calculate `publishedAfter` for recent videos
-    published_after = (datetime.utcnow() - timedelta(days=days_ago)).isoformat("T") + "Z"
+    # Calculate `publishedAfter` for recent videos. It's rounded down to midnight UTC so every run on the
+    # same day sends identical search URLs, which lets the HTTP cache revalidate them instead of refetching.
+    published_after = (datetime.utcnow() - timedelta(days=days_ago)).replace(hour=0, minute=0, second=0, microsecond=0)
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        published_after = max(published_after, since)
+    published_after = published_after.isoformat("T") + "Z"
 
     print(f"Starting YouTube data extraction for {len(search_terms)} terms, looking back {days_ago} days...")
     
-    # Use a set to store unique video IDs to avoid duplicates
+    # Use a set to store unique video IDs to avoid duplicates across terms.
+    # IDs are stored as ints (see _video_key): exact, and far smaller than the id strings.
     seen_video_ids = set()
 
-    for term in search_terms:
-        print(f"\nSearching for term: '{term}'")
+    search = partial(_search_one_term, published_after=published_after, max_results=max_results, days_ago=days_ago)
+    fetch_details = partial(_fetch_video_details, min_views=min_views)
+    cache = _load_details_cache(details_cache_path)
+    cached_details = partial(_cached_video_details, cache, min_views=min_views)
+    cached_count = 0
+    with pq.ParquetWriter(output_path, VIDEO_SCHEMA, compression="snappy") as writer, \
+            ThreadPoolExecutor(max_workers=YOUTUBE_WORKERS) as search_pool, \
+            ThreadPoolExecutor(max_workers=YOUTUBE_DETAIL_WORKERS) as detail_pool:
+        # Search results are deduplicated across all terms first (in term order, so the first term
+        # to find a video keeps it), then the unique IDs are packed into full videos.list batches of
+        # 50 regardless of which term found them. Each full batch goes to the detail pool straight
+        # away, overlapping with the searches still running. Batches are written in submission
+        # order, so rows come out grouped by term as before.
+        # Videos with fresh cached details are batched separately and read from the cache instead.
+        pending = deque()
+        batch = {}
+        cached_batch = {}
+        for term, video_ids in zip(search_terms, search_pool.map(search, search_terms)):
+            for video_id in video_ids:
+                video_key = _video_key(video_id)
+                if video_key in seen_video_ids:
+                    continue
+                seen_video_ids.add(video_key)
+                if video_id in cache.index:
+                    cached_batch[video_id] = term
+                    cached_count += 1
+                    if len(cached_batch) == VIDEOS_PER_DETAILS_REQUEST:
+                        pending.append(detail_pool.submit(cached_details, cached_batch))
+                        cached_batch = {}
+                    continue
+                batch[video_id] = term
+                if len(batch) == VIDEOS_PER_DETAILS_REQUEST:
+                    pending.append(detail_pool.submit(fetch_details, batch))
+                    batch = {}
+            while pending and pending[0].done():
+                video_count += _append_batch(writer, pending.popleft().result())
+        if batch:
+            pending.append(detail_pool.submit(fetch_details, batch))
+        if cached_batch:
+            pending.append(detail_pool.submit(cached_details, cached_batch))
+        while pending:
+            video_count += _append_batch(writer, pending.popleft().result())
+
+    if cached_count:
+        print(f"Reused cached details for {cached_count} of {len(seen_video_ids)} videos.")
+    if details_cache_path is not None:
         try:
-            # Perform the search request
-            request = youtube.search().list(
-                part="snippet",
-                q=term,
-                type="video", # We only want videos
-                order="relevance", # Sort by relevance
-                publishedAfter=published_after, # Only recent videos
-                maxResults=max_results,
-                relevanceLanguage="en", # Filter for English videos
-            )
-            response = request.execute()
-
-            video_ids_for_stats = []
-            if response.get('items'):
-                print(f"  Found {len(response['items'])} potential videos for '{term}'")
-                for item in response['items']:
-                    video_id = item['id']['videoId']
-                    if video_id not in seen_video_ids:
-                        video_ids_for_stats.append(video_id)
-                        seen_video_ids.add(video_id)
-            else:
-                print(f"  No videos found for '{term}' in the last {days_ago} days.")
-
-            # If we found video IDs, get their statistics (views, likes, comments)
-            if video_ids_for_stats:
-                # Max 50 video IDs per videos.list request
-                for i in range(0, len(video_ids_for_stats), 50):
-                    batch_ids = video_ids_for_stats[i:i+50]
-                    videos_request = youtube.videos().list(
-                        part="snippet,statistics",
-                        id=",".join(batch_ids)
-                    )
-                    videos_response = videos_request.execute()
-
-                    for video_item in videos_response.get('items', []):
-                        snippet = video_item['snippet']
-                        stats = video_item.get('statistics', {}) # statistics might be missing for some videos
-
-                        video_info = {
-                            "platform": "YouTube",
-                            "video_id": video_item['id'],
-                            "search_term_matched": term,
-                            "title": snippet['title'],
-                            "description": snippet['description'],
-                            "published_at": snippet['publishedAt'],
-                            "channel_title": snippet['channelTitle'],
-                            "channel_id": snippet['channelId'],
-                            "view_count": stats.get('viewCount', 0),
-                            "like_count": stats.get('likeCount', 0), # Likes might be disabled/hidden
-                            "comment_count": stats.get('commentCount', 0), # Comments might be disabled
-                            "tags": snippet.get('tags', []), # Hashtags in description or video tags
-                            # You can add more fields if needed, e.g., default_thumbnail.url
-                            "thumbnail_url": snippet['thumbnails']['high']['url'] if 'thumbnails' in snippet and 'high' in snippet['thumbnails'] else None,
-                        }
-                        all_video_data.append(video_info)
-            
-            # Be polite to the API
-            time.sleep(random.randint(5, 15))
-
-        except googleapiclient.errors.HttpError as e:
-            print(f"  YouTube API HTTP Error for term '{term}': {e}")
-            if e.resp.status == 403: # Forbidden, often means API Key issues or quota exceeded
-                print("  Quota Exceeded or API Key issue. Check your Google Cloud Console for daily quota.")
-                # You might want to break here if it's a hard quota
-            elif e.resp.status == 400: # Bad Request
-                print("  Bad request. Check your search query parameters.")
-            print("  Skipping to next term due to API error.")
+            _save_details_cache(details_cache_path, output_path, cache)
         except Exception as e:
-            print(f"  An unexpected error occurred for term '{term}': {e}")
+            print(f"Warning: Could not update the YouTube details cache {details_cache_path}: {e}")
+    return video_count
 
-    return pd.DataFrame(all_video_data)
+def _upload_videos(youtube_videos_df):
+    """Uploads the extracted videos to the YouTube_Product_Content worksheet. Returns True on success."""
+    try:
+        from upload_to_sheets import upload_to_google_sheet
+        print("\nAttempting to upload data to Google Sheets...")
+        # Parquet reads tags back as arrays; lists keep the "['a', 'b']" cell text the sheet has always had
+        youtube_videos_df['tags'] = youtube_videos_df['tags'].map(list)
+        return upload_to_google_sheet(youtube_videos_df, "AI_Content_Optimizer_Data", "YouTube_Product_Content")
+    except ImportError:
+        print("\nWarning: upload_to_sheets.py not found. Skipping Google Sheets upload.")
+    except Exception as e:
+        print(f"\nError uploading to Google Sheets: {e}")
+    return False
 
 # --- Main Execution ---
 if __name__ == "__main__":
     print("--- Starting YouTube Product Marketing Video Extraction ---")
-    youtube_videos_df = get_product_marketing_videos(YOUTUBE_PRODUCT_SEARCH_TERMS)
+    video_count = get_product_marketing_videos(YOUTUBE_PRODUCT_SEARCH_TERMS)
 
-    if not youtube_videos_df.empty:
-        output_csv_path = "youtube_product_marketing_videos.csv"
-        youtube_videos_df.to_csv(output_csv_path, index=False)
-        print(f"\nSuccessfully extracted {len(youtube_videos_df)} unique product-related YouTube videos.")
-        print(f"Data saved to {output_csv_path}")
+    youtube_videos_df = None
+    if video_count:
+        print(f"\nSuccessfully extracted {video_count} unique product-related YouTube videos.")
+        print(f"Data saved to {OUTPUT_PARQUET_PATH}")
+        youtube_videos_df = pd.read_parquet(OUTPUT_PARQUET_PATH)
         print("\nFirst 5 rows of extracted data:")
         print(youtube_videos_df.head())
-
-        # --- Integrate with Google Sheets ---
-        try:
-            from upload_to_sheets import upload_to_google_sheet
-            print("\nAttempting to upload data to Google Sheets...")
-            upload_to_google_sheet(youtube_videos_df, "AI_Content_Optimizer_Data", "YouTube_Product_Content")
-        except ImportError:
-            print("\nWarning: upload_to_sheets.py not found. Skipping Google Sheets upload.")
-        except Exception as e:
-            print(f"\nError uploading to Google Sheets: {e}")
-
     else:
         print("\nNo product marketing videos found or an error occurred during extraction.")
     print("\n--- YouTube Product Marketing Video Extraction Complete ---")
 
+    # --- Google Sheets Upload ---
+    # The Parquet file was already written batch by batch during extraction, so the upload is the
+    # only work left; the Slack message points at the sheet, so it's only sent once the upload succeeded.
+    uploaded = youtube_videos_df is None or _upload_videos(youtube_videos_df)
 
     # --- Slack Notification Integration ---
     from slack_notifier import send_slack_notification
 
-    if send_slack_notification:
+    if uploaded:
         slack_message = (
             f":sparkles: New YouTube product marketing videos found! :youtube:\n"
-            f"Extracted {len(youtube_videos_df)} unique product-related YouTube videos.\n"
+            f"Extracted {video_count} unique product-related YouTube videos.\n"
             f"Check the Google Sheet here: https://docs.google.com/spreadsheets/d/1aAdsgz9AagAOxkRSoxdaIaJ6N76U8G1xb4mPC-_h5HE/edit?usp=sharing\n" # IMPORTANT: Replace with actual link
             f"Worksheet: AI_Content_Optimizer_Data\n"
             f"Check: YouTube_Product_Content worksheet for the details."
         )
         send_slack_notification(slack_message)
-        
     else:
-        print("Slack notification function not available.")
-    
\ No newline at end of file
+        print("Skipping Slack notification: the Google Sheets upload did not succeed.")